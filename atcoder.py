@@ -1,22 +1,89 @@
 import requests
 from bs4 import BeautifulSoup
 import re
-import time
-import json
+import argparse
+import threading
+from queue import Queue, Empty
 from tqdm import tqdm
 from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+
+from fetcher import make_session
+from http_cache import DAY, cached_get
+from journal import ProblemJournal
+from metrics import ScrapeMetrics
+
+BASE_URL = 'https://atcoder.jp'
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+metrics = ScrapeMetrics('atcoder')
+
+def pooled_session(pool_size=8, rate=2.0):
+    """Keep-alive session with a connection pool, behind a per-host rate limit."""
+    pooled = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    pooled.mount('https://', adapter)
+    pooled.mount('http://', adapter)
+    pooled.headers.update(HEADERS)
+    return make_session(pooled, metrics, rate)
+
+session = pooled_session()
 
 def clean_text(text):
     return ' '.join(text.strip().split())
 
 def scrape_problem(url):
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    response = requests.get(url, headers=headers)
+    response = cached_get(session, url, headers=HEADERS, ttl=30 * DAY)
+    metrics.record_lookup(response)
     if response.status_code != 200:
         print(f"Failed to fetch {url}")
         return None
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    with metrics.timer('parse'):
+        soup = BeautifulSoup(response.content, 'html.parser')
+    with metrics.timer('extract'):
+        return parse_problem(soup)
+
+STATEMENT_HEADING = re.compile(r'Problem Statement|Task', re.I)
+CONSTRAINTS_HEADING = re.compile(r'Constraints', re.I)
+INPUT_HEADING = re.compile(r'Input', re.I)
+OUTPUT_HEADING = re.compile(r'Output', re.I)
+SAMPLE_HEADING = re.compile(r'Sample (Input|Output) (\d+)')
+
+def index_sections(soup):
+    """Classifies every div.part of the English statement by its h3 heading, in one pass.
+
+    Field headings are matched against the h3's own string, like the old per-field
+    `find('h3', string=...)` scans; sample headings carry a nested Copy button, so
+    they are matched against the full h3 text. Input and output keep their first
+    match, so "Sample Input 1" never shadows "Input".
+    """
+    root = soup.find('span', class_='lang-en') or soup
+    sections = {
+        'statement': [], 'constraints': [], 'input': None, 'output': None,
+        'sample_input': {}, 'sample_output': {},
+    }
+    for section in root.find_all('div', class_='part'):
+        h3 = section.find('h3')
+        if not h3:
+            continue
+        heading = h3.string
+        if heading is not None:
+            if STATEMENT_HEADING.search(heading):
+                sections['statement'].append(section)
+            if CONSTRAINTS_HEADING.search(heading):
+                sections['constraints'].append(section)
+            if sections['input'] is None and INPUT_HEADING.search(heading):
+                sections['input'] = section
+            if sections['output'] is None and OUTPUT_HEADING.search(heading):
+                sections['output'] = section
+        sample = SAMPLE_HEADING.search(h3.text)
+        if sample:
+            kind = 'sample_input' if sample.group(1) == 'Input' else 'sample_output'
+            sections[kind].setdefault(int(sample.group(2)), section)
+    return sections
+
+def parse_problem(soup):
     problem_data = {}
 
     # Problem Title
@@ -28,75 +95,53 @@ def scrape_problem(url):
     else:
         problem_data['name'] = 'Unknown'
 
+    # Single pass over the English sections, indexed by their h3 heading
+    sections = index_sections(soup)
+
     # Problem Statement
-    statement_sections = soup.find_all('div', class_='part')
     problem_statement = []
-    for section in statement_sections:
-        if section.find('h3', string=re.compile(r'Problem Statement|Task', re.I)):
-            paragraphs = section.find_all(['p', 'pre', "ul"])
-            for p in paragraphs:
-                if p.name == 'pre':
-                    problem_statement.append(f"```\n{p.text.strip()}\n```")
-                else:
-                    problem_statement.append(clean_text(p.text))
+    for section in sections['statement']:
+        paragraphs = section.find_all(['p', 'pre', "ul"])
+        for p in paragraphs:
+            if p.name == 'pre':
+                problem_statement.append(f"```\n{p.text.strip()}\n```")
+            else:
+                problem_statement.append(clean_text(p.text))
     problem_data['statement'] = '\n\n'.join(problem_statement)
 
     # Constraints
     constraints = []
-    for section in statement_sections:
-        if section.find('h3', string=re.compile(r'Constraints', re.I)):
-            items = section.find_all(['p', 'li', 'pre',])
-            for item in items:
-                constraints.append(clean_text(item.text))
-            # print(items, end='\n\n\n')
+    for section in sections['constraints']:
+        items = section.find_all(['p', 'li', 'pre',])
+        for item in items:
+            constraints.append(clean_text(item.text))
     # problem_data['constraints'] = '\n'.join(constraints)
     constraints = '\n'.join(constraints)
 
     # Input Format
     input_format = []
-    for section in statement_sections:
-        if section.find('h3', string=re.compile(r'Input', re.I)):
-            items = section.find_all(['pre'])
-
-            for item in items:
-                if item.name == 'pre':
-                    input_format.append(f"```\n{item.text.strip()}\n```")
-                else:
-                    input_format.append(clean_text(item.text))
-            if input_format is not None:
-                break
+    if sections['input']:
+        for item in sections['input'].find_all(['pre']):
+            input_format.append(f"```\n{item.text.strip()}\n```")
     # problem_data['input_format'] = '\n'.join(input_format)
     problem_data['input_format'] = constraints + ' \n '.join(input_format)
 
     # Output Format
     output_format = []
-    for section in statement_sections:
-        if section.find('h3', string=re.compile(r'Output', re.I)):
-            items = section.find_all(['p', 'pre'])
-            for item in items:
-                if item.name == 'pre':
-                    output_format.append(f"```\n{item.text.strip()}\n```")
-                else:
-                    output_format.append(clean_text(item.text))
-            if output_format is not None:
-                break
+    if sections['output']:
+        for item in sections['output'].find_all(['p', 'pre']):
+            if item.name == 'pre':
+                output_format.append(f"```\n{item.text.strip()}\n```")
+            else:
+                output_format.append(clean_text(item.text))
     problem_data['output_format'] = ' \n '.join(output_format)
 
     # Example Tests
     examples = []
     sample_idx = 1
-    while True:
-        sample_input_section = None
-        sample_output_section = None
-        for section in statement_sections:
-            h3 = section.find('h3')
-            if h3:
-                if f'Sample Input {sample_idx}' in h3.text:
-                    sample_input_section = section
-                elif f'Sample Output {sample_idx}' in h3.text:
-                    sample_output_section = section
-        if not (sample_input_section or sample_output_section):
-            break
+    while sample_idx in sections['sample_input'] or sample_idx in sections['sample_output']:
+        sample_input_section = sections['sample_input'].get(sample_idx)
+        sample_output_section = sections['sample_output'].get(sample_idx)
 
         example = {}
         if sample_input_section:
@@ -118,46 +163,174 @@ def scrape_problem(url):
 
     return problem_data
 
-def main():
-    base_url = 'https://atcoder.jp'
-    problems = {}
+def task_container(title_span):
+    """Largest ancestor of a task title that holds no other task title."""
+    node = title_span.parent
+    while node.parent is not None and len(node.parent.find_all('span', class_='h2')) == 1:
+        node = node.parent
+    return node
 
-    problems_count = 0
+def scrape_contest_print(contest_id):
+    """Scrapes every task of a contest from its single tasks_print page."""
+    url = f"{BASE_URL}/contests/abc{contest_id}/tasks_print"
+    response = cached_get(session, url, headers=HEADERS, ttl=30 * DAY)
+    metrics.record_lookup(response)
+    if response.status_code != 200:
+        print(f"Failed to fetch {url}")
+        return None
 
-    for contest_id in tqdm(range(50, 411), desc="Processing", total=(411-50)):
-        formatted_contest_id = f"{contest_id:03d}"
-        problems[formatted_contest_id] = {}
-        contest_url = f"https://atcoder.jp/contests/abc{formatted_contest_id}/tasks"
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(contest_url, headers=headers)
-        if response.status_code != 200:
-            print(f"Failed to fetch contest page for {contest_url}")
-            continue
+    with metrics.timer('parse'):
+        soup = BeautifulSoup(response.content, 'html.parser')
+    with metrics.timer('extract'):
+        return [parse_problem(task_container(title_span)) for title_span in soup.find_all('span', class_='h2')]
 
+def get_task_urls(contest_id):
+    """Returns (task letter, url) for every task on a contest's task list, or None."""
+    contest_url = f"{BASE_URL}/contests/abc{contest_id}/tasks"
+    response = cached_get(session, contest_url, headers=HEADERS, ttl=30 * DAY)
+    metrics.record_lookup(response)
+    if response.status_code != 200:
+        print(f"Failed to fetch contest page for {contest_url}")
+        return None
+
+    with metrics.timer('parse'):
         soup = BeautifulSoup(response.content, 'html.parser')
-        task_table = soup.find('table', class_='table table-bordered table-striped')
-        if not task_table:
-            print("Task table not found")
-            break
-
-        for row in task_table.find('tbody').find_all('tr'):
-            link = row.find('td', class_='text-center no-break').find('a')
-            if link and 'href' in link.attrs:
-                problem_url = urljoin(base_url, link['href'])
-                problem_data = scrape_problem(problem_url)
-                if problem_data:
-                    problems_count += 1
-                    problem_id = problem_data['name'].split('-')[0]
-                    problems[formatted_contest_id][problem_id] = problem_data
-                    # problems.append(problem_data)
-                # break
-        time.sleep(2)
-
-    # Save to JSON
-    with open('datafiles/abc_problems.json', 'w', encoding='utf-8') as f:
-        json.dump(problems, f, indent=4, ensure_ascii=False)
-
-    print(f"Scraped {problems_count} problems and saved to abc_problems.json")
+    task_table = soup.find('table', class_='table table-bordered table-striped')
+    if not task_table:
+        print(f"Task table not found for {contest_url}")
+        return None
+
+    task_urls = []
+    for row in task_table.find('tbody').find_all('tr'):
+        link = row.find('td', class_='text-center no-break').find('a')
+        if link and 'href' in link.attrs:
+            task_urls.append((link.text.strip(), urljoin(BASE_URL, link['href'])))
+    return task_urls
+
+def crawl(contest_ids, done, concurrency=4, tasks_print=False, on_contest_done=None):
+    """Producer/consumer crawl over `contest_ids`.
+
+    Producers fetch contest task lists and feed task URLs into a bounded queue that
+    consumers drain, so task-list and task fetches overlap under the shared per-host
+    rate limit. With `tasks_print`, producers parse every task from the contest's
+    tasks_print page and the consumers stay idle. `on_contest_done` is called from the
+    calling thread once per finished contest.
+
+    Yields:
+        (contest_id, problem_id, problem_data) for every scraped task not in `done`.
+    """
+    contest_queue = Queue()
+    for contest_id in contest_ids:
+        contest_queue.put(contest_id)
+    task_queue = Queue(maxsize=4 * concurrency)
+    results = Queue(maxsize=4 * concurrency)
+
+    num_producers = max(1, concurrency // 2)
+    num_consumers = concurrency
+    producers_left = [num_producers]
+    lock = threading.Lock()
+
+    def produce():
+        while True:
+            try:
+                contest_id = contest_queue.get_nowait()
+            except Empty:
+                break
+            try:
+                if tasks_print:
+                    for problem_data in scrape_contest_print(contest_id) or []:
+                        problem_id = problem_data['name'].split('-')[0]
+                        if (contest_id, problem_id.strip()) not in done:
+                            results.put(('problem', (contest_id, problem_id, problem_data)))
+                else:
+                    for letter, url in get_task_urls(contest_id) or []:
+                        if (contest_id, letter) not in done:
+                            task_queue.put((contest_id, url))
+            except Exception as e:
+                print(f"Error crawling contest {contest_id}: {e}")
+            results.put(('contest', contest_id))
+        with lock:
+            producers_left[0] -= 1
+            if producers_left[0] == 0:
+                for _ in range(num_consumers):
+                    task_queue.put(None)
+
+    def consume():
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            contest_id, url = task
+            try:
+                problem_data = scrape_problem(url)
+            except Exception as e:
+                print(f"Error scraping {url}: {e}")
+                problem_data = None
+            if problem_data:
+                results.put(('problem', (contest_id, problem_data['name'].split('-')[0], problem_data)))
+        results.put(None)
+
+    threads = [threading.Thread(target=produce, daemon=True) for _ in range(num_producers)]
+    threads += [threading.Thread(target=consume, daemon=True) for _ in range(num_consumers)]
+    for thread in threads:
+        thread.start()
+
+    consumers_left = num_consumers
+    while consumers_left:
+        item = results.get()
+        if item is None:
+            consumers_left -= 1
+        elif item[0] == 'contest':
+            if on_contest_done:
+                on_contest_done()
+        else:
+            yield item[1]
+
+def task_order(key):
+    """Orders AtCoder tasks A..H before two-letter ones like Ex."""
+    contest_id, problem_id = key
+    problem_id = problem_id.strip()
+    return contest_id, len(problem_id), problem_id
+
+def main(start=50, end=410, concurrency=4, rate=2.0, tasks_print=False):
+    global session
+    session = pooled_session(pool_size=concurrency, rate=rate)
+    contests = [f"{contest_id:03d}" for contest_id in range(start, end + 1)]
+
+    journal = ProblemJournal('datafiles/abc_problems.jsonl')
+    # Keys are the "A " prefix of the task name, while the task table only shows "A"
+    done = {(contest, index.strip()) for contest, index in journal.done()}
+
+    problems_count = 0
+
+    with tqdm(desc="Processing", total=len(contests)) as progress:
+        for contest_id, problem_id, problem_data in crawl(contests, done, concurrency, tasks_print,
+                                                          on_contest_done=lambda: progress.update(1)):
+            problems_count += 1
+            metrics.count('problems')
+            with metrics.timer('serialize'):
+                journal.append(contest_id, problem_id, problem_data)
+
+    # Compact the journal into the nested JSON layout; tasks finish out of order
+    with metrics.timer('serialize'):
+        journal.compact('datafiles/abc_problems.json', contests=contests,
+                        order=sorted(journal.done(), key=task_order))
+
+    print(f"Scraped {problems_count} problems ({len(done)} resumed from journal) and saved to abc_problems.json")
+    metrics.write()
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start", type=int, default=50,
+                        help="First ABC contest number to scrape")
+    parser.add_argument("--end", type=int, default=410,
+                        help="Last ABC contest number to scrape (inclusive)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Number of task fetches in flight")
+    parser.add_argument("--rate", type=float, default=2.0,
+                        help="Request budget for atcoder.jp, in requests per second")
+    parser.add_argument("--tasks-print", action="store_true",
+                        help="Scrape each contest from its single tasks_print page")
+    args = parser.parse_args()
+
+    main(args.start, args.end, args.concurrency, args.rate, args.tasks_print)
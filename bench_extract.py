@@ -0,0 +1,73 @@
+"""Times parse + extract per page over a directory of saved problem pages
+
+By default the pages committed under tests/fixtures/pages/<site> are used; --fetch saves
+live pages there first.
+"""
+import os
+import time
+import argparse
+
+import cloudscraper
+from bs4 import BeautifulSoup
+
+import atcoder
+from codeforces import extract_problem_data, parse_page
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "pages")
+
+def load_pages(pages_dir: str):
+    pages = []
+    for name in sorted(os.listdir(pages_dir)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(pages_dir, name), "r", encoding="utf-8") as f:
+                pages.append(f.read())
+    return pages
+
+def fetch_pages(urls, pages_dir: str) -> None:
+    """Saves each URL as <last path segments>.html, e.g. contest_2094_problem_A.html."""
+    os.makedirs(pages_dir, exist_ok=True)
+    session = cloudscraper.create_scraper()  # Codeforces sits behind Cloudflare
+    for url in urls:
+        response = session.get(url)
+        response.raise_for_status()
+        name = "_".join(url.rstrip("/").split("/")[3:]) + ".html"
+        with open(os.path.join(pages_dir, name), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"Saved {url} to {os.path.join(pages_dir, name)}")
+
+def bench_codeforces(pages, parser: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extract_problem_data(parse_page(html, parser=parser))
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+def bench_atcoder(pages, parser: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            atcoder.parse_problem(BeautifulSoup(html, parser))
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=str, required=False,
+                       help="Directory of saved problem pages (default: tests/fixtures/pages/<site>)")
+    parser.add_argument("--site", type=str, default="codeforces", choices=["codeforces", "atcoder"])
+    parser.add_argument("--parsers", type=str, default="html.parser,lxml",
+                       help="Comma separated BeautifulSoup backends to compare")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fetch", type=str, nargs="+", required=False,
+                       help="Problem page URLs to save into the pages directory before benchmarking")
+    args = parser.parse_args()
+
+    pages_dir = args.pages or os.path.join(FIXTURE_DIR, args.site)
+    if args.fetch:
+        fetch_pages(args.fetch, pages_dir)
+    pages = load_pages(pages_dir)
+    assert pages, f"No .html pages found in {pages_dir}"
+
+    bench = bench_codeforces if args.site == "codeforces" else bench_atcoder
+    for backend in args.parsers.split(","):
+        per_page = bench(pages, backend, args.repeat)
+        print(f"{args.site} [{backend}]: {per_page * 1e3:.2f} ms/page over {len(pages)} pages")
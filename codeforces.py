@@ -1,21 +1,141 @@
 import os
 import csv
-import json
-import time
 import argparse
 import pandas as pd
 import cloudscraper
+import lxml.html
+from lxml import etree
 
 from tqdm import tqdm
-from bs4 import BeautifulSoup
-from typing import Dict, List, Optional
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from typing import Dict, List, Optional, Tuple
 import re
 
+from fetcher import fetch_all, make_session
+from http_cache import DAY, cached_get
+from journal import ProblemJournal, read_journal
+from metrics import ScrapeMetrics
+from problem_index import ProblemIndex
+
+# Everything extract_problem_data reads lives inside this div, so nothing else gets parsed
+STATEMENT_CLASS = "problem-statement"
+STATEMENT_STRAINER = SoupStrainer("div", class_=STATEMENT_CLASS)
+# On /contest/{id}/problems every statement sits in one of these, tagged with its index
+PROBLEM_HOLDER_CLASS = "problemindexholder"
+
+# Per-division journal of scraped problems, compacted into datafiles/div{div}_problems.json
+JOURNAL_PATH = "datafiles/div{div}_problems.jsonl"
+
+# Containers that are walked into, instead of being emitted as one line, when they hold blocks
+BLOCK_CONTAINERS = {"div", "ul", "ol", "center"}
+BLOCK_TAGS = ["div", "p", "ul", "ol", "li", "pre", "center", "table"]
+
+def extract_all_text(section) -> str:
+    """Extracts one line of text per block element of `section`, in a single pass.
+
+    Blocks are emitted once, with their inline children (tex spans, bold, ...) folded
+    into the same line, so text is no longer repeated once per nesting level.
+    """
+    if not section:
+        return ""
+    texts = []
+    stack = [iter(section.children)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            continue
+        if not isinstance(child, Tag) or child.name in ["script", "style"]:
+            continue
+        if child.name in BLOCK_CONTAINERS and child.find(BLOCK_TAGS, recursive=False):
+            stack.append(iter(child.children))
+            continue
+        text = child.get_text(separator=" ", strip=True)
+        if text:
+            texts.append(text)
+    return "\n".join(texts)
+
+def parse_page(html: str, div_class: str = STATEMENT_CLASS, parser: str = "lxml") -> BeautifulSoup:
+    """Parses only the `div_class` subtrees of a page.
+
+    With lxml the page is parsed by lxml's C parser and only the matching subtrees
+    are handed to BeautifulSoup; building the soup is the expensive part. Other
+    backends fall back to a SoupStrainer, which still tokenizes the whole page.
+    """
+    if parser == "lxml":
+        document = lxml.html.fromstring(html)
+        nodes = document.xpath(f'//div[contains(concat(" ", normalize-space(@class), " "), " {div_class} ")]')
+        fragment = "".join(etree.tostring(node, encoding="unicode", method="html", with_tail=False)
+                           for node in nodes)
+        return BeautifulSoup(fragment, "lxml")
+    strainer = STATEMENT_STRAINER if div_class == STATEMENT_CLASS else SoupStrainer("div", class_=div_class)
+    return BeautifulSoup(html, parser, parse_only=strainer)
+
+def extract_problem_data(soup: BeautifulSoup) -> Dict:
+    """Problem fields from a parsed statement; needs no session, so it can run on saved pages."""
+    problem_data = {
+        "name": "",
+        "statement": "",
+        "input_format": "",
+        "output_format": "",
+        "examples": [],
+        "notes": ""
+    }
+
+    # Problem name
+    title = soup.find("div", class_="title")
+    if title:
+        problem_data["name"] = title.text.strip()
+
+    # Problem statement
+    statement = soup.find("div", class_="problem-statement")
+    if statement:
+        paragraphs = statement.find_all("div", recursive=False)[1]  # Skip header
+        problem_data["statement"] = "\n".join(p.text.strip() for p in paragraphs if p.text.strip())
+
+    # Input format
+    input_section = soup.find("div", class_="input-specification")
+    problem_data["input_format"] = extract_all_text(input_section)
+
+    # Output format
+    output_section = soup.find("div", class_="output-specification")
+    problem_data["output_format"] = extract_all_text(output_section)
+
+    # Examples
+    sample_tests = soup.find_all("div", class_="sample-test")
+    for sample in sample_tests:
+        input_data = sample.find("div", class_="input")
+        output_data = sample.find("div", class_="output")
+        if input_data and output_data:
+            input_lines = [
+                line.text.strip() for line in input_data.find("pre").find_all("div", class_="test-example-line")
+            ]
+            output_lines = [
+                line.text.strip() for line in output_data.find("pre").find_all("div", class_="test-example-line")
+            ]
+            if not input_lines:
+                input_lines = input_data.find("pre").text.strip().split("\n")
+            if not output_lines:
+                output_lines = output_data.find("pre").text.strip().split("\n")
+            problem_data["examples"].append({"input": input_lines, "output": output_lines})
+
+    # Notes
+    notes = soup.find("div", class_="note")
+    problem_data["notes"] = extract_all_text(notes)
+
+    return problem_data
+
 class CodeforcesScraper:
-    def __init__(self, div: int):
+    def __init__(self, div: int, concurrency: int = 4, rate: float = 0.5, parser: str = "lxml",
+                 batch_contests: bool = False):
         self.base_url = "https://codeforces.com"
         self.div = div
+        self.concurrency = concurrency
+        self.batch_contests = batch_contests  # One /contest/{id}/problems request per contest
+        self.parser = parser  # Any BeautifulSoup tree builder: "lxml", "html.parser", ...
         self.scraper = cloudscraper.create_scraper()  # Use cloudscraper to bypass Cloudflare
+        self.metrics = ScrapeMetrics(f"codeforces_div{div}")
+        self.session = make_session(self.scraper, self.metrics, rate)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
             "Referer": "https://codeforces.com/",
@@ -23,123 +143,180 @@ class CodeforcesScraper:
             "Accept-Language": "en-US,en;q=0.5"
         }
 
-    def get_problem_page(self, contest_id: str, problem_id: str) -> Optional[BeautifulSoup]:
-        url = f"{self.base_url}/contest/{contest_id}/problem/{problem_id}"
+    def get_page(self, url: str, div_class: str = STATEMENT_CLASS) -> Optional[BeautifulSoup]:
         try:
-            response = self.scraper.get(url, headers=self.headers)
+            response = cached_get(self.session, url, headers=self.headers, ttl=30 * DAY)
+            self.metrics.record_lookup(response)
             response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
+            with self.metrics.timer("parse"):
+                return self.parse(response.text, div_class)
         except Exception as e:
             print(f"Error fetching {url}: {str(e).encode('utf-8', errors='replace').decode()}")
             return None
 
+    def get_problem_page(self, contest_id: str, problem_id: str) -> Optional[BeautifulSoup]:
+        return self.get_page(f"{self.base_url}/contest/{contest_id}/problem/{problem_id}")
+
+    def get_contest_page(self, contest_id: str) -> Optional[BeautifulSoup]:
+        return self.get_page(f"{self.base_url}/contest/{contest_id}/problems", PROBLEM_HOLDER_CLASS)
+
+    def split_contest_page(self, soup: BeautifulSoup) -> Dict[str, Tag]:
+        """Maps each problem index on a /contest/{id}/problems page to its own subtree."""
+        problems = {}
+        for holder in soup.find_all("div", class_=PROBLEM_HOLDER_CLASS):
+            index = holder.get("problemindex")
+            if index and holder.find("div", class_=STATEMENT_CLASS):
+                problems[index] = holder
+        return problems
+
+    def parse(self, html: str, div_class: str = STATEMENT_CLASS) -> BeautifulSoup:
+        return parse_page(html, div_class, self.parser)
+
     def extract_problem_data(self, soup: BeautifulSoup) -> Dict:
-        problem_data = {
-            "name": "",
-            "statement": "",
-            "input_format": "",
-            "output_format": "",
-            "examples": [],
-            "notes": ""
-        }
+        return extract_problem_data(soup)
+
+    def scrape_problem(self, task: Tuple[int, str]) -> Optional[Dict]:
+        contest_id, problem_id = task
+        soup = self.get_problem_page(str(contest_id), problem_id)
+        if not soup:
+            return None
+        with self.metrics.timer("extract"):
+            return self.extract_problem_data(soup)
+
+    def scrape_contest(self, task: Tuple[int, List[str]]) -> Dict[str, Dict]:
+        """Extracts the requested problems of one contest from its single problems page."""
+        contest_id, problem_ids = task
+        soup = self.get_contest_page(str(contest_id))
+        if not soup:
+            return {}
+        with self.metrics.timer("extract"):
+            problems = self.split_contest_page(soup)
+            return {
+                problem_id: self.extract_problem_data(problems[str(problem_id)])
+                for problem_id in problem_ids if str(problem_id) in problems
+            }
+
+    def borrow_scraped(self, journal: ProblemJournal, index: ProblemIndex, wanted: set) -> set:
+        """Copies the `wanted` problems the index marks as scraped from other divisions' journals.
 
-        # Problem name
-        title = soup.find("div", class_="title")
-        if title:
-            problem_data["name"] = title.text.strip()
-
-        # Problem statement
-        statement = soup.find("div", class_="problem-statement")
-        if statement:
-            paragraphs = statement.find_all("div", recursive=False)[1]  # Skip header
-            problem_data["statement"] = "\n".join(p.text.strip() for p in paragraphs if p.text.strip())
-
-        # Helper function to extract text from all nested elements
-        def extract_all_text(section) -> str:
-            if not section:
-                return ""
-            texts = []
-            for elem in section.find_all(recursive=True):
-                if elem.name in ["script", "style"]:
-                    continue
-                text = elem.get_text(separator=" ", strip=True)
-                if text:
-                    texts.append(text)
-            return "\n".join(texts)
-
-        # Input format
-        input_section = soup.find("div", class_="input-specification")
-        problem_data["input_format"] = extract_all_text(input_section)
-
-        # Output format
-        output_section = soup.find("div", class_="output-specification")
-        problem_data["output_format"] = extract_all_text(output_section)
-
-        # Examples
-        sample_tests = soup.find_all("div", class_="sample-test")
-        for sample in sample_tests:
-            input_data = sample.find("div", class_="input")
-            output_data = sample.find("div", class_="output")
-            if input_data and output_data:
-                input_lines = [
-                    line.text.strip() for line in input_data.find("pre").find_all("div", class_="test-example-line")
-                ]
-                output_lines = [
-                    line.text.strip() for line in output_data.find("pre").find_all("div", class_="test-example-line")
-                ]
-                if not input_lines:
-                    input_lines = input_data.find("pre").text.strip().split("\n")
-                if not output_lines:
-                    output_lines = output_data.find("pre").text.strip().split("\n")
-                problem_data["examples"].append({"input": input_lines, "output": output_lines})
-
-        # Notes
-        notes = soup.find("div", class_="note")
-        problem_data["notes"] = extract_all_text(notes)
-
-        return problem_data
-
-    def scrape_problems(self, contest_ids: List[int], problem_ids: List[str]):
-        all_problems_data = {}
-        total, success = 0, 0
+        Returns:
+            set: The (contest, index) keys copied; anything else is fetched again.
+        """
+        missing = {(str(contest_id), str(problem_id)) for contest_id, problem_id in index.scraped()} & wanted
+        borrowed = set()
+        for div in range(1, 5):
+            if not missing or div == self.div:
+                continue
+            for key, data in read_journal(JOURNAL_PATH.format(div=div)).items():
+                if key in missing:
+                    journal.append(*key, data)
+                    missing.discard(key)
+                    borrowed.add(key)
+        if borrowed:
+            print(f"Copied {len(borrowed)} problems scraped in other divisions' runs into {journal.path}")
+        return borrowed
+
+    def scrape_problems(self, contest_ids: List[int], problem_ids: List[str], index: ProblemIndex = None):
+        """Scrapes the given problems into datafiles/div{N}_problems.json.
+
+        Problems already in the journal are not fetched again. If a ProblemIndex is
+        given, every newly scraped problem gets marked there, and problems it marks as
+        scraped are skipped as long as another division's journal still holds them;
+        they are copied over, since the output is compacted from this journal alone.
+        """
+        total, success, resumed = 0, 0, 0
         unsuccessful_list = []
 
         print("Scraping CF data")
 
-        for _, (contest_id, problem_id) in tqdm(enumerate(zip(contest_ids, problem_ids)), desc="Processing", total=len(contest_ids)):
-            total += 1
-            if contest_id not in all_problems_data:
-                all_problems_data[contest_id] = {}
+        journal = ProblemJournal(JOURNAL_PATH.format(div=self.div))
+        done = journal.done()
+        tasks = list(zip(contest_ids, problem_ids))
+        if index is not None:
+            wanted = {(str(contest_id), str(problem_id)) for contest_id, problem_id in tasks} - done
+            done |= self.borrow_scraped(journal, index, wanted)
+
+        pending = []
+        for contest_id, problem_id in tasks:
+            if (str(contest_id), str(problem_id)) in done:
+                resumed += 1
+            else:
+                pending.append((contest_id, problem_id))
+        if resumed:
+            print(f"Resuming: {resumed} problems already in {journal.path}")
 
-            soup = self.get_problem_page(str(contest_id), problem_id)
-            if soup:
-                data = self.extract_problem_data(soup)
-                all_problems_data[contest_id][problem_id] = data
+        if self.batch_contests:
+            # Group by contest, keeping input order; whatever a contest page lacks is fetched one by one below
+            by_contest = {}
+            for contest_id, problem_id in pending:
+                by_contest.setdefault(contest_id, []).append(problem_id)
+
+            pending = []
+            for (contest_id, wanted), problems in tqdm(fetch_all(self.scrape_contest, by_contest.items(), self.concurrency), desc="Contests", total=len(by_contest)):
+                if isinstance(problems, Exception):
+                    print(f"Error extracting contest {contest_id}: {problems}")
+                    problems = {}
+                for problem_id in wanted:
+                    if problems.get(problem_id):
+                        total += 1
+                        success += 1
+                        self.metrics.count("problems")
+                        with self.metrics.timer("serialize"):
+                            journal.append(contest_id, problem_id, problems[problem_id])
+                        if index is not None:
+                            index.mark_scraped(contest_id, problem_id)
+                    else:
+                        pending.append((contest_id, problem_id))
+            if pending:
+                print(f"{len(pending)} problems missing from contest pages, fetching them individually")
+
+        for (contest_id, problem_id), data in tqdm(fetch_all(self.scrape_problem, pending, self.concurrency), desc="Processing", total=len(pending)):
+            total += 1
+            if isinstance(data, Exception):
+                print(f"Error extracting {contest_id}/{problem_id}: {data}")
+                data = None
+            if data:
+                self.metrics.count("problems")
+                with self.metrics.timer("serialize"):
+                    journal.append(contest_id, problem_id, data)
+                if index is not None:
+                    index.mark_scraped(contest_id, problem_id)
                 success += 1
             else:
                 unsuccessful_list.append(f"{contest_id}/{problem_id}")
 
-            time.sleep(4)
-
-        # Save all kept problems
-        with open(f"datafiles/div{self.div}_problems.json", "w", encoding="utf-8") as f:
-            json.dump(all_problems_data, f, indent=4, ensure_ascii=False)
+        # Compact the journal into the nested layout, in input order
+        with self.metrics.timer("serialize"):
+            journal.compact(f"datafiles/div{self.div}_problems.json", contests=contest_ids, order=tasks)
+        self.metrics.count("failures", len(unsuccessful_list))
 
         # Print statistics
         print(f"\nScraping Statistics for Division {self.div}:")
         print(f"Total problems processed: {total}")
+        print(f"Resumed from journal: {resumed}")
         print(f"Successfully scraped: {success}")
         print(f"Failed to scrape: {len(unsuccessful_list)}")
+        self.metrics.write()
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--dir", type=str, required=True,
                        help="Location of csv containing problem info")
+    parser.add_argument("--index", type=str, required=False,
+                       help="SQLite problem index written by dataset.py; problems it marks as scraped are skipped")
     parser.add_argument("--div", type=int, required=True,
                        help="Division number (1-4)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                       help="Maximum number of requests in flight")
+    parser.add_argument("--rate", type=float, default=0.5,
+                       help="Request budget per host, in requests per second")
+    parser.add_argument("--parser", type=str, default="lxml",
+                       help="BeautifulSoup parser backend (lxml, html.parser, html5lib)")
+    parser.add_argument("--batch-contests", action="store_true",
+                       help="Fetch each contest's /problems page once instead of one page per problem")
 
     args = parser.parse_args()
-    scraper = CodeforcesScraper(args.div)
+    scraper = CodeforcesScraper(args.div, args.concurrency, args.rate, args.parser, args.batch_contests)
 
     obj = pd.read_csv(args.dir)
     contest_ids = obj["contestId"].tolist()
@@ -147,7 +324,8 @@ def main():
 
     assert len(contest_ids) == len(problem_ids)
 
-    scraper.scrape_problems(contest_ids, problem_ids)
+    index = ProblemIndex(args.index) if args.index else None
+    scraper.scrape_problems(contest_ids, problem_ids, index)
 
 if __name__ == "__main__":
     main()
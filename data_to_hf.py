@@ -1,19 +1,68 @@
+import os
+import json
+import argparse
+
 from datasets import DatasetDict, Dataset
-import pandas as pd
 
-# Read CSV files
-df1 = pd.read_csv("datafiles/cp_datasetv3_train.csv")
-df2 = pd.read_csv("datafiles/cp_datasetv3_test.csv")
+SPLIT_FORMATS = (".csv", ".parquet")
+
+def resolve_split(path: str) -> str:
+    """`path` if it exists, else the same split in the other format dataset_split.py writes."""
+    base, ext = os.path.splitext(path)
+    if os.path.isfile(path) or ext not in SPLIT_FORMATS:
+        return path
+    for other in SPLIT_FORMATS:
+        if os.path.isfile(base + other):
+            return base + other
+    raise FileNotFoundError(f"No {base}.csv or {base}.parquet to load.")
+
+def load_split(path: str) -> Dataset:
+    """Parquet is read straight into a memory-mapped Arrow dataset; CSV is still accepted."""
+    path = resolve_split(path)
+    if path.endswith(".parquet"):
+        return Dataset.from_parquet(path)
+    return Dataset.from_csv(path)
+
+def load_shards(shard_dir: str) -> DatasetDict:
+    """Builds every split listed in the manifest written by dataset_split.py --shards."""
+    with open(os.path.join(shard_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    loader = Dataset.from_parquet if manifest["format"] == "parquet" else Dataset.from_csv
+    return DatasetDict({
+        split: loader([os.path.join(shard_dir, entry["file"]) for entry in entries])
+        for split, entries in manifest["splits"].items()
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the train/test DatasetDict and publish it.")
+    parser.add_argument("--train", type=str, default="datafiles/cp_datasetv3_train.csv",
+                        help="Train split written by dataset_split.py; the .parquet sibling is used if "
+                             "only that one exists")
+    parser.add_argument("--test", type=str, default="datafiles/cp_datasetv3_test.csv",
+                        help="Test split written by dataset_split.py; the .parquet sibling is used if "
+                             "only that one exists")
+    parser.add_argument("--repo", type=str, default="israel-adewuyi/Astra_datav1",
+                        help="Hub repository to push to")
+    parser.add_argument("--shards", type=str, required=False,
+                        help="Shard directory with a manifest.json; replaces --train/--test")
+    parser.add_argument("--save-to-disk", type=str, required=False,
+                        help="Also save the DatasetDict to this local directory for offline use")
+    parser.add_argument("--no-push", action="store_true", help="Skip pushing to the Hub")
+    args = parser.parse_args()
 
-# Convert to Hugging Face Dataset
-dataset1 = Dataset.from_pandas(df1)
-dataset2 = Dataset.from_pandas(df2)
+    # Combine into a DatasetDict (optional, if you want splits)
+    if args.shards:
+        dataset = load_shards(args.shards)
+    else:
+        dataset = DatasetDict({
+            "train": load_split(args.train),
+            "test": load_split(args.test),
+        })
 
-# Combine into a DatasetDict (optional, if you want splits)
-dataset = DatasetDict({
-    "train": dataset1,
-    "test": dataset2,
-})
+    if args.save_to_disk:
+        dataset.save_to_disk(args.save_to_disk)
+        print(f"Saved {dataset} to {args.save_to_disk}")
 
-# Push to the Hub
-dataset.push_to_hub("israel-adewuyi/Astra_datav1", private=True)
\ No newline at end of file
+    # Push to the Hub
+    if not args.no_push:
+        dataset.push_to_hub(args.repo, private=True)
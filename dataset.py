@@ -4,7 +4,15 @@ import argparse
 import requests
 import pandas as pd
 
-from typing import List
+from typing import Dict, List
+
+from fetcher import make_session
+from http_cache import DAY, HOUR, cached_get
+from metrics import ScrapeMetrics
+from problem_index import DEFAULT_INDEX_PATH, ProblemIndex
+
+metrics = ScrapeMetrics("dataset")
+session = make_session(requests, metrics, 0.5)
 
 def get_list_of_all_contests() -> List[dict]:
     """Fetches list of all contests from CF
@@ -13,20 +21,24 @@ def get_list_of_all_contests() -> List[dict]:
         List[dict]: List of dictionaries containing all contests from CF
     """
     url = "https://codeforces.com/api/contest.list?gym=false"
-    response = requests.get(url)
+    # New contests show up all the time, so keep this one short-lived
+    response = cached_get(session, url, ttl=HOUR)
+    metrics.record_lookup(response)
     if response.status_code == 200:
-        data = response.json()
+        with metrics.timer("parse"):
+            data = response.json()
         return data['result']
     else:
         print(response.status_code)
     return None
 
-def filter_contests(division: int, contests: List[dict]) -> List[dict]:
+def filter_contests(division: int, contests: List[dict], index: ProblemIndex = None) -> List[dict]:
     """Filters the list of contests for contests of a specific division
 
     Args:
         division (int): _description_
         list_of_all_contests (List[dict]): _description_
+        index (ProblemIndex, optional): If given, contests already in the index are skipped
 
     Returns:
         List[dict]: _description_
@@ -35,8 +47,12 @@ def filter_contests(division: int, contests: List[dict]) -> List[dict]:
 
     div_str = [f"Div. {div}" for div in range(division, 5)]
 
+    known_ids = index.known_contest_ids() if index is not None else set()
+
     filtered_list = []
     for contest in contests:
+        if contest['id'] in known_ids:
+            continue
         for div in div_str:
             if div in contest['name'] and contest['relativeTimeSeconds'] > 0:
                 filtered_list.append(contest)
@@ -45,26 +61,53 @@ def filter_contests(division: int, contests: List[dict]) -> List[dict]:
     return filtered_list
 
 
+def problem_row(contestId: int, problem_info: dict) -> dict:
+    """Builds one row of datafiles/div{N}.csv from a Codeforces API Problem object"""
+    return {
+        "contestId": contestId,
+        "index": problem_info['index'],
+        "name": problem_info['name'],
+        "rating": problem_info.get('rating'),
+        "tags": ";".join(problem_info.get('tags', [])),
+    }
+
 def get_problem_info(contestId: int) -> List[dict | None]:
     url =  f"https://codeforces.com/api/contest.standings?contestId={contestId}"
-    response = requests.get(url)
+    response = cached_get(session, url, ttl=30 * DAY)
+    metrics.record_lookup(response)
     if response.status_code == 200:
-        problem_info_list = []
-        data = response.json()
-        all_problem_info = data['result']['problems']
+        with metrics.timer("parse"):
+            data = response.json()
+        with metrics.timer("extract"):
+            all_problem_info = data['result']['problems']
+            return [problem_row(contestId, problem_info) for problem_info in all_problem_info]
+    return None
+
+def get_all_problems() -> Dict[int, List[dict]]:
+    """Fetches every Codeforces problem with a single problemset.problems call
+
+    Returns:
+        Dict[int, List[dict]]: Rows grouped by contestId, ordered by problem index
+    """
+    url = "https://codeforces.com/api/problemset.problems"
+    response = cached_get(session, url, ttl=HOUR)
+    metrics.record_lookup(response)
+    if response.status_code != 200:
+        print(response.status_code)
+        return None
 
+    with metrics.timer("parse"):
+        all_problem_info = response.json()['result']['problems']
+    with metrics.timer("extract"):
+        problems_by_contest = {}
         for problem_info in all_problem_info:
-            index = problem_info['index']
-            name = problem_info['name']
-
-            temp_log = {
-                "contestId": contestId,
-                "index": index,
-                "name": name
-            }
-            problem_info_list.append(temp_log)
-        return problem_info_list
-    return None
+            if 'contestId' not in problem_info:
+                continue
+            contestId = problem_info['contestId']
+            problems_by_contest.setdefault(contestId, []).append(problem_row(contestId, problem_info))
+        for rows in problems_by_contest.values():
+            rows.sort(key=lambda row: row['index'])
+    return problems_by_contest
 
 if __name__ == "__main__":
 
@@ -72,6 +115,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--div", type=int, required=True, 
                        help="Division number (1-4)")
+    parser.add_argument("--discovery", type=str, default="bulk", choices=["bulk", "standings"],
+                       help="bulk: one problemset.problems call; standings: one contest.standings call per contest")
+    parser.add_argument("--index", type=str, default=DEFAULT_INDEX_PATH,
+                       help="SQLite index of contests and problems seen so far")
+    parser.add_argument("--rebuild", action="store_true",
+                       help="Query every contest again, not just the ones missing from the index")
     args = parser.parse_args()
 
     list_of_all_contests = get_list_of_all_contests()
@@ -83,18 +132,39 @@ if __name__ == "__main__":
 
     print(f"There are {len(list_of_contests)} contests that are >= div {args.div}")
 
-    problem_info_list, faulty_response = [], []
-    for contest in list_of_contests:
-        contestId = contest['id']
-        contest_details = get_problem_info(contestId)
+    # Only contests missing from the index get queried, so a refresh only touches new contests
+    index = ProblemIndex(args.index)
+    if args.rebuild:
+        new_contests = list_of_contests
+    else:
+        new_contests = filter_contests(args.div, list_of_all_contests, index)
+
+    last_refresh = time.ctime(index.watermark()) if index.watermark() else "never"
+    print(f"{len(new_contests)} of them are not in {args.index} yet (last refresh: {last_refresh})")
+
+    problems_by_contest = {}
+    if new_contests and args.discovery == "bulk":
+        problems_by_contest = get_all_problems() or {}
+
+    faulty_response = []
+    for contest in new_contests:
+        # problemset.problems first, contest.standings for whatever it doesn't know about
+        contest_details = problems_by_contest.get(contest['id']) or get_problem_info(contest['id'])
         if contest_details:
-            problem_info_list.extend(contest_details)
+            metrics.count("problems", len(contest_details))
+            with metrics.timer("serialize"):
+                index.add_contest(contest, contest_details)
         else:
             faulty_response.append(contest)
-        time.sleep(2)
 
-    dataframe = pd.DataFrame(problem_info_list)
-    dataframe.to_csv(f"datafiles/div{args.div}.csv", index=False)
+    problem_info_list = index.problems(contest['id'] for contest in list_of_contests)
+
+    dataframe = pd.DataFrame(problem_info_list, columns=["contestId", "index", "name", "rating", "tags"])
+    dataframe["rating"] = dataframe["rating"].astype("Int64")  # unrated problems stay blank, not 800.0
+    with metrics.timer("serialize"):
+        dataframe.to_csv(f"datafiles/div{args.div}.csv", index=False)
 
     print(f"In total, there are {len(problem_info_list)} codeforces problems scraped")
+    print(f"Index: {index.stats()}")
     print(f"Faulty responses \n{faulty_response}")
+    metrics.write()
@@ -1,11 +1,22 @@
 import os
+import re
 import csv
 import json
-from typing import List
+import hashlib
+import argparse
+from typing import Callable, Iterable, Iterator, List, Tuple
 
-def flatten_problem_data(contest_id, problem_key, problem_data):
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from records import is_jsonl, read_records, record_to_problem
+from shard_writer import write_shards
+
+def flatten_problem_data(contest_id, problem_key, problem_data, nested_examples=False):
     """
     Flatten each problem into a single row dictionary.
+    Examples are a JSON string for CSV, or kept as a list of dicts with `nested_examples`.
     """
     examples = problem_data.get("examples", [])
     processed_examples = [
@@ -25,79 +36,351 @@ def flatten_problem_data(contest_id, problem_key, problem_data):
         "statement": problem_data.get("statement", ""),
         "input_format": problem_data.get("input_format", ""),
         "output_format": problem_data.get("output_format", ""),
-        "examples": json.dumps(processed_examples),
+        "examples": processed_examples if nested_examples else json.dumps(processed_examples),
         "notes": problem_data.get("notes", ""),
         "datasource": problem_data.get("datasource", "")
     }
     return row
 
-def split_json_to_csv(input_path):
+FIELDNAMES = [
+    "contest_id", "problem_id", "problem_key", "name", "statement",
+    "input_format", "output_format", "examples", "notes", "datasource"
+]
+
+EXAMPLE_TYPE = pa.struct([
+    ("input", pa.list_(pa.string())),
+    ("output", pa.list_(pa.string())),
+    ("explanation", pa.string()),
+])
+
+PARQUET_SCHEMA = pa.schema([
+    (name, pa.list_(EXAMPLE_TYPE) if name == "examples" else pa.string()) for name in FIELDNAMES
+])
+
+class CsvSplitWriter:
+    def __init__(self, path: str):
+        self.file = open(path, mode='w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=FIELDNAMES)
+        self.writer.writeheader()
+
+    def write(self, contest_id, problem_key, problem_data) -> None:
+        self.writer.writerow(flatten_problem_data(contest_id, problem_key, problem_data))
+
+    def close(self) -> None:
+        self.file.close()
+
+class ParquetSplitWriter:
+    """Writes rows as Parquet with a nested examples column, one row group per `batch_size` rows."""
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.writer = pq.ParquetWriter(path, PARQUET_SCHEMA)
+        self.batch_size = batch_size
+        self.rows = []
+
+    def write(self, contest_id, problem_key, problem_data) -> None:
+        self.rows.append(flatten_problem_data(contest_id, problem_key, problem_data, nested_examples=True))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=PARQUET_SCHEMA))
+            self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+SPLIT_WRITERS = {"csv": CsvSplitWriter, "parquet": ParquetSplitWriter}
+
+def is_test_record(record: dict) -> bool:
+    """Test: CF contests >= 2030 or AtC contests >= 383. Train: all others"""
+    contest_id = record["contest_id"]
+    datasource = record.get("datasource", "")
+    try:
+        # Extract numeric contest ID (handle CF_ prefix for Codeforces)
+        numeric_id = int(contest_id.replace("CF_", "") if contest_id.startswith("CF_") else contest_id)
+    except ValueError:
+        print(f"Warning: Invalid contest_id format {contest_id}, defaulting to train")
+        return False
+    return (datasource == "CF" and numeric_id >= 2030) or (datasource == "AtC" and numeric_id >= 383)
+
+def hash_fraction_policy(fraction: float) -> Callable[[dict], bool]:
+    """Sends a stable `fraction` of contests to test, chosen by hashing (datasource, contest_id)."""
+    def is_test(record: dict) -> bool:
+        key = f"{record.get('datasource', '')}\t{record['contest_id']}"
+        value = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+        return value / 2 ** 64 < fraction
+    return is_test
+
+def datasource_policy(test_sources: Iterable[str]) -> Callable[[dict], bool]:
+    """Sends every problem from `test_sources` (e.g. AtC) to test."""
+    test_sources = set(test_sources)
+    return lambda record: record.get("datasource", "") in test_sources
+
+SPLIT_POLICIES = ("contest", "hash", "datasource")
+
+def make_policy(name: str = "contest", test_fraction: float = 0.1,
+                test_sources: Iterable[str] = ("AtC",)) -> Callable[[dict], bool]:
+    if name == "contest":
+        return is_test_record
+    if name == "hash":
+        return hash_fraction_policy(test_fraction)
+    if name == "datasource":
+        return datasource_policy(test_sources)
+    raise ValueError(f"Unknown split policy {name}, expected one of {SPLIT_POLICIES}")
+
+def normalize_lines(value) -> str:
+    """Sample input/output with whitespace collapsed per line and blank lines dropped."""
+    lines = value if isinstance(value, list) else str(value).split("\n")
+    return "\n".join(" ".join(str(line).split()) for line in lines if str(line).strip())
+
+def hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def ngram_hashes(text: str, n: int = 10, sample: int = 4, short: int = 64) -> np.ndarray:
+    """Unique 64-bit hashes of the word n-grams in `text`.
+
+    Only hashes divisible by `sample` are kept. Train and test are sampled the same way,
+    so the overlap ratio is preserved while the index shrinks by that factor. Texts with
+    fewer than `short` n-grams keep all of them, since sampling would leave next to none.
+    """
+    words = re.findall(r"\w+", text.lower())
+    values = {hash64(" ".join(words[i:i + n])) for i in range(len(words) - n + 1)}
+    if len(values) >= short:
+        values = {value for value in values if value % sample == 0}
+    return np.fromiter(values, dtype=np.uint64, count=len(values))
+
+MIN_SAMPLE_CHARS = 8
+
+def example_hashes(record: dict) -> np.ndarray:
+    """One hash per sample test, over its normalized input and output.
+
+    Sample I/O is short and mostly numbers, so word n-grams say little about it; an
+    identical sample is what gives a copied problem away.
+    """
+    values = set()
+    for example in record.get("examples") or []:
+        sample_input = normalize_lines(example.get("input", []))
+        sample_output = normalize_lines(example.get("output", []))
+        # Samples like "1" -> "1" turn up in unrelated problems
+        if len(sample_input) + len(sample_output) >= MIN_SAMPLE_CHARS:
+            values.add(hash64(sample_input + "\0" + sample_output))
+    return np.fromiter(values, dtype=np.uint64, count=len(values))
+
+# Fields a test problem can leak through, and how to hash them: (record, n, sample) -> hashes
+LEAK_FIELDS = {
+    "statement": lambda record, n, sample: ngram_hashes(record.get("statement") or "", n, sample),
+    "examples": lambda record, n, sample: example_hashes(record),
+}
+# Field reported for a record none of whose leak fields produced a hash
+UNSCORED = "unscored"
+
+class NgramIndex:
+    """Sorted array of hashes per leak field over the train split.
+
+    About 8 bytes per hash; lookups are a binary search per hash.
     """
-    Reads the merged JSON, splits into train and test CSVs based on:
-    - Test: CF contests >= 2008 or AtC contests >= 350
+    def __init__(self, n: int = 10, sample: int = 4):
+        self.n = n
+        self.sample = sample
+        self.parts = {field: [] for field in LEAK_FIELDS}
+        self.index = {}
+
+    def add(self, record: dict) -> None:
+        for field, hashes in LEAK_FIELDS.items():
+            self.parts[field].append(hashes(record, self.n, self.sample))
+
+    def build(self) -> "NgramIndex":
+        for field, parts in self.parts.items():
+            self.index[field] = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.uint64)
+        self.parts = None
+        return self
+
+    def score(self, record: dict) -> Tuple[float, str]:
+        """Highest fraction of a record's hashes found in train, over the leak fields.
+
+        Returns:
+            Tuple[float, str]: The score and the field it came from, or (0.0, UNSCORED)
+            when no field of the record produced any hash.
+        """
+        best = (0.0, UNSCORED)
+        for field, field_hashes in LEAK_FIELDS.items():
+            hashes, index = field_hashes(record, self.n, self.sample), self.index[field]
+            if not len(hashes):
+                continue
+            found = np.zeros(len(hashes), dtype=bool)
+            if len(index):
+                found = index[np.minimum(np.searchsorted(index, hashes), len(index) - 1)] == hashes
+            if best[1] == UNSCORED or float(found.mean()) > best[0]:
+                best = (float(found.mean()), field)
+        return best
+
+def build_train_index(records: Iterable[dict], n: int = 10, sample: int = 4,
+                      is_test: Callable[[dict], bool] = is_test_record) -> NgramIndex:
+    index = NgramIndex(n, sample)
+    for record in records:
+        if not is_test(record):
+            index.add(record)
+    return index.build()
+
+def assign_split(record: dict, is_test: Callable[[dict], bool] = is_test_record,
+                 train_index: NgramIndex = None, leak_threshold: float = 0.5,
+                 move_leaks: bool = False, leaks: List[dict] = None) -> str:
+    """"train" or "test" for one record, after the policy and the leak check.
+
+    With a `train_index`, each test record is scored against it. Records at or above
+    `leak_threshold` are appended to `leaks`, and go to train instead of test if
+    `move_leaks` is set.
+    """
+    if not is_test(record):
+        return "train"
+    if train_index is not None:
+        score, field = train_index.score(record)
+        leaked = field != UNSCORED and score >= leak_threshold
+        # Nothing to compare isn't the same as clean, so unscored records are listed too
+        if (leaked or field == UNSCORED) and leaks is not None:
+            leaks.append({"contest_id": record["contest_id"], "problem_key": record["problem_key"],
+                          "datasource": record.get("datasource", ""),
+                          "name": record.get("name", ""), "field": field,
+                          "score": round(score, 3), "moved": leaked and move_leaks})
+        if leaked and move_leaks:
+            return "train"
+    return "test"
+
+def split_records_to_csv(records: Iterable[dict], train_file: str, test_file: str,
+                         train_index: NgramIndex = None, leak_threshold: float = 0.5,
+                         move_leaks: bool = False, leaks: List[dict] = None,
+                         file_format: str = "csv", is_test: Callable[[dict], bool] = is_test_record
+                         ) -> Tuple[int, int]:
+    """Streams records into the train and test files (CSV or Parquet), one row at a time.
+
+    Returns:
+        Tuple[int, int]: Number of train and test rows written.
+    """
+    paths = {"train": train_file, "test": test_file}
+    counts = {"train": 0, "test": 0}
+    writers = {split: SPLIT_WRITERS[file_format](path) for split, path in paths.items()}
+    try:
+        for record in records:
+            contest_id, problem_key, problem_data = record_to_problem(record)
+            split = assign_split(record, is_test, train_index, leak_threshold, move_leaks, leaks)
+            writers[split].write(contest_id, problem_key, problem_data)
+            counts[split] += 1
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return counts["train"], counts["test"]
+
+def split_records_to_shards(records: Iterable[dict], out_dir: str, num_shards: int,
+                            train_index: NgramIndex = None, leak_threshold: float = 0.5,
+                            move_leaks: bool = False, leaks: List[dict] = None,
+                            file_format: str = "parquet", is_test: Callable[[dict], bool] = is_test_record,
+                            workers: int = 4, policy: str = "contest") -> Tuple[int, int]:
+    """Like split_records_to_csv, but into `num_shards` hash-assigned shards per split plus a manifest.
+
+    Returns:
+        Tuple[int, int]: Number of train and test rows written.
+    """
+    def rows():
+        for record in records:
+            split = assign_split(record, is_test, train_index, leak_threshold, move_leaks, leaks)
+            yield (split, record, *record_to_problem(record))
+
+    manifest = write_shards(rows(), out_dir, num_shards, file_format, workers, policy)
+    counts = {split: sum(entry["rows"] for entry in entries) for split, entries in manifest["splits"].items()}
+    return counts.get("train", 0), counts.get("test", 0)
+
+def checked_records(input_path: str) -> Iterator[dict]:
+    """read_records, raising ValueError on malformed JSON even when it sits on a late JSONL line."""
+    try:
+        yield from read_records(input_path)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"The file is not a valid JSON format: {e}")
+
+def split_json_to_csv(input_path, decontaminate: bool = True, leak_threshold: float = 0.5,
+                      move_leaks: bool = False, ngram: int = 10, sample: int = 4, file_format: str = "csv",
+                      policy: str = "contest", test_fraction: float = 0.1, test_sources=("AtC",),
+                      shards: int = 0, workers: int = 4):
+    """
+    Reads the merged JSON (or JSONL records), splits into train and test CSVs (or Parquet) based on
+    the split policy, by default:
+    - Test: CF contests >= 2030 or AtC contests >= 383
     - Train: All others
+    Test problems whose statement or sample I/O overlaps train are listed in
+    <base>_leaks.jsonl, and moved to train with `move_leaks`. Test problems with neither a
+    statement nor samples to compare are listed there as "unscored".
+    With `shards`, each split is written as that many shards under <base>_shards/ instead.
     """
+    is_test = make_policy(policy, test_fraction, test_sources)
     # Check if file exists
     if not os.path.isfile(input_path):
         raise FileNotFoundError(f"The file {input_path} does not exist.")
 
-    # Load JSON data
-    try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except json.JSONDecodeError:
-        raise ValueError("The file is not a valid JSON format.")
-
-    # Initialize train and test rows
-    train_rows = []
-    test_rows = []
-
-    # Fieldnames for CSV
-    fieldnames = [
-        "contest_id", "problem_id", "problem_key", "name", "statement",
-        "input_format", "output_format", "examples", "notes", "datasource"
-    ]
-
-    # Process each contest and problem
-    for contest_id, problems in data.items():
-        for problem_key, problem_data in problems.items():
-            row = flatten_problem_data(contest_id, problem_key, problem_data)
-            # Determine if test or train
-            datasource = problem_data.get("datasource", "")
-            try:
-                # Extract numeric contest ID (handle CF_ prefix for Codeforces)
-                numeric_id = int(contest_id.replace("CF_", "") if contest_id.startswith("CF_") else contest_id)
-                if (datasource == "CF" and numeric_id >= 2030) or (datasource == "AtC" and numeric_id >= 383):
-                    test_rows.append(row)
-                else:
-                    train_rows.append(row)
-            except ValueError:
-                print(f"Warning: Invalid contest_id format {contest_id}, defaulting to train")
-                train_rows.append(row)
+    # JSONL is streamed; the legacy nested JSON has to be loaded once
+    records = checked_records(input_path)
+    if not is_jsonl(input_path):
+        records = list(records)
 
     # Get directory and base name
     dir_name = os.path.dirname(input_path)
     base_name = os.path.splitext(os.path.basename(input_path))[0]
+    train_file = os.path.join(dir_name, f"{base_name}_train.{file_format}")
+    test_file = os.path.join(dir_name, f"{base_name}_test.{file_format}")
 
-    # Save train CSV
-    train_file = os.path.join(dir_name, f"{base_name}_train.csv")
-    with open(train_file, mode='w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(train_rows)
-    print(f"Saved train dataset ({len(train_rows)} rows) to {train_file}")
-
-    # Save test CSV
-    test_file = os.path.join(dir_name, f"{base_name}_test.csv")
-    with open(test_file, mode='w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(test_rows)
-    print(f"Saved test dataset ({len(test_rows)} rows) to {test_file}")
+    # A first pass hashes the train split; the split pass then scores test records against it
+    train_index, leaks = None, []
+    if decontaminate:
+        train_index = build_train_index(records, ngram, sample, is_test)
+        if is_jsonl(input_path):
+            records = checked_records(input_path)
 
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) != 2:
-        print("Usage: python dataset_split.py <path_to_merged_json>")
+    if shards:
+        out_dir = os.path.join(dir_name, f"{base_name}_shards")
+        train_count, test_count = split_records_to_shards(records, out_dir, shards, train_index,
+                                                          leak_threshold, move_leaks, leaks, file_format,
+                                                          is_test, workers, policy)
+        train_file = test_file = out_dir
     else:
-        split_json_to_csv(sys.argv[1])
\ No newline at end of file
+        train_count, test_count = split_records_to_csv(records, train_file, test_file,
+                                                       train_index, leak_threshold, move_leaks, leaks,
+                                                       file_format, is_test)
+    print(f"Saved train dataset ({train_count} rows) to {train_file}")
+    print(f"Saved test dataset ({test_count} rows) to {test_file}")
+
+    if decontaminate:
+        leaks_file = os.path.join(dir_name, f"{base_name}_leaks.jsonl")
+        with open(leaks_file, "w", encoding="utf-8") as f:
+            for leak in leaks:
+                f.write(json.dumps(leak, ensure_ascii=False) + "\n")
+        unscored = sum(leak["field"] == UNSCORED for leak in leaks)
+        action = "moved to train" if move_leaks else "flagged"
+        print(f"{len(leaks) - unscored} test problems overlap train and were {action}, "
+              f"{unscored} had nothing to score, see {leaks_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split merged problems into train and test CSVs.")
+    parser.add_argument("input", type=str, help="Path to the merged JSON or JSONL")
+    parser.add_argument("--no-decontaminate", action="store_true",
+                        help="Skip scoring test problems against the train split")
+    parser.add_argument("--leak-threshold", type=float, default=0.5,
+                        help="Fraction of a test problem's n-grams found in train that counts as a leak")
+    parser.add_argument("--move-leaks", action="store_true",
+                        help="Move leaked test problems to train instead of only flagging them")
+    parser.add_argument("--ngram", type=int, default=10, help="Words per n-gram")
+    parser.add_argument("--sample", type=int, default=4,
+                        help="Keep 1 in this many statement n-gram hashes to shrink the index (short statements keep all)")
+    parser.add_argument("--format", type=str, default="csv", choices=sorted(SPLIT_WRITERS),
+                        help="parquet keeps examples as a nested list<struct> column instead of a JSON string")
+    parser.add_argument("--policy", type=str, default="contest", choices=SPLIT_POLICIES,
+                        help="contest: id thresholds, hash: stable fraction of contests, datasource: whole sources")
+    parser.add_argument("--test-fraction", type=float, default=0.1, help="Share of contests in test for --policy hash")
+    parser.add_argument("--test-sources", type=str, default="AtC",
+                        help="Comma separated datasources in test for --policy datasource")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Write each split as this many hash-assigned shards plus a manifest")
+    parser.add_argument("--workers", type=int, default=4, help="Processes writing shards in parallel")
+    args = parser.parse_args()
+
+    split_json_to_csv(args.input, not args.no_decontaminate, args.leak_threshold, args.move_leaks,
+                      args.ngram, args.sample, args.format, args.policy, args.test_fraction,
+                      args.test_sources.split(","), args.shards, args.workers)
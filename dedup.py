@@ -0,0 +1,153 @@
+"""Near-duplicate removal between merge_problems.py and dataset_split.py.
+
+Every problem gets a MinHash signature over the word shingles of statement +
+input_format. LSH banding buckets the signatures so only problems sharing a band are
+compared, which keeps the stage roughly linear in the number of problems. Candidate
+pairs are checked against each other, and pairs from the same contest (e.g. the easy
+and hard versions E1/E2) are never merged. Walking the problems in input order, each
+kept problem drops every later problem that is at or above the similarity threshold
+with it directly.
+
+Usage:
+    python dedup.py datafiles/merged.jsonl datafiles/merged_dedup.jsonl
+"""
+import re
+import json
+import zlib
+import argparse
+from itertools import combinations
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from records import read_records, write_records
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+DEDUP_FIELDS = ("statement", "input_format")
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """crc32 of every `size`-word window of the normalized text."""
+    words = re.sub(r"\$+", " ", text.lower()).split()
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    windows = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.fromiter((zlib.crc32(w.encode("utf-8")) for w in windows), dtype=np.uint64, count=len(windows))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a, b and the shingle hashes all stay below 2**32, so a * x + b fits in uint64
+        self.a = rng.randint(1, MAX_HASH, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.randint(0, MAX_HASH, size=num_perm, dtype=np.uint64)[:, None]
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        return ((self.a * hashes[None, :] + self.b) % MERSENNE_PRIME & MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def record_text(record: dict) -> str:
+    return "\n".join(record.get(field) or "" for field in DEDUP_FIELDS)
+
+
+def find_clusters(records: Iterable[dict], threshold: float = 0.8, num_perm: int = 128,
+                  bands: int = 32) -> Dict[int, List[tuple]]:
+    """Clusters near-duplicate records.
+
+    Returns:
+        Dict[int, List[tuple]]: Canonical position -> [(duplicate position, estimated
+        similarity), ...], for clusters with at least one duplicate.
+    """
+    assert num_perm % bands == 0, "num_perm must be a multiple of bands"
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm)
+    signatures, contests, buckets = {}, {}, defaultdict(list)
+    for position, record in enumerate(records):
+        hashes = shingles(record_text(record))
+        if not len(hashes):
+            continue
+        signature = hasher.signature(hashes)
+        signatures[position] = signature
+        contests[position] = (record.get("datasource", ""), record.get("contest_id"))
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows].tobytes())].append(position)
+
+    # Every candidate pair is verified on its own; a pair is never inferred through a
+    # third record, so A~B and B~C does not drop C unless C~A too
+    similar, checked = defaultdict(dict), set()
+    for members in buckets.values():
+        for pair in combinations(members, 2):
+            if pair in checked:
+                continue
+            checked.add(pair)
+            # Easy and hard versions of one contest (E1/E2) share most of their text
+            if contests[pair[0]] == contests[pair[1]]:
+                continue
+            similarity = float(np.mean(signatures[pair[0]] == signatures[pair[1]]))
+            if similarity >= threshold:
+                similar[pair[0]][pair[1]] = similar[pair[1]][pair[0]] = similarity
+
+    # In input order, each record not yet dropped keeps every later record it matches
+    duplicates, dropped = defaultdict(list), set()
+    for position in sorted(similar):
+        if position in dropped:
+            continue
+        for other, similarity in sorted(similar[position].items()):
+            if other > position and other not in dropped:
+                dropped.add(other)
+                duplicates[position].append((other, round(similarity, 3)))
+    return {root: sorted(members) for root, members in sorted(duplicates.items())}
+
+
+def record_id(record: dict) -> dict:
+    return {"datasource": record.get("datasource", ""), "contest_id": record["contest_id"],
+            "problem_key": record["problem_key"], "name": record.get("name", "")}
+
+
+def dedup(input_path: str, output_path: str, report_path: str = None, threshold: float = 0.8,
+          num_perm: int = 128, bands: int = 32) -> None:
+    """Writes `input_path` minus near-duplicates to `output_path`, plus a cluster report."""
+    clusters = find_clusters(read_records(input_path), threshold, num_perm, bands)
+    dropped = {position for members in clusters.values() for position, _ in members}
+
+    # Second pass over the input: stream the kept records out, note the cluster members
+    members = {}
+    wanted = dropped | set(clusters)
+
+    def kept():
+        for position, record in enumerate(read_records(input_path)):
+            if position in wanted:
+                members[position] = record_id(record)
+            if position not in dropped:
+                yield record
+
+    count = write_records(output_path, kept())
+
+    report = [
+        {
+            "canonical": members[root],
+            "duplicates": [{**members[position], "similarity": similarity} for position, similarity in dups],
+        }
+        for root, dups in clusters.items()
+    ]
+    report_path = report_path or re.sub(r"\.jsonl?$", "", output_path) + "_clusters.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Kept {count} problems in {output_path}; dropped {len(dropped)} near-duplicates "
+          f"in {len(clusters)} clusters, see {report_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drop near-duplicate problems from merged data.")
+    parser.add_argument("input", type=str, help="Merged problems (.jsonl or legacy .json)")
+    parser.add_argument("output", type=str, help="Deduplicated output (.jsonl or legacy .json)")
+    parser.add_argument("--report", type=str, required=False, help="Where to write the cluster report")
+    parser.add_argument("--threshold", type=float, default=0.8,
+                        help="Estimated Jaccard similarity at which two problems count as duplicates")
+    parser.add_argument("--num-perm", type=int, default=128, help="MinHash permutations")
+    parser.add_argument("--bands", type=int, default=32, help="LSH bands (num-perm must be a multiple)")
+    args = parser.parse_args()
+
+    dedup(args.input, args.output, args.report, args.threshold, args.num_perm, args.bands)
@@ -0,0 +1,95 @@
+"""Bounded thread-pool fetch engine with a per-host request budget"""
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+from metrics import InstrumentedSession, ScrapeMetrics
+
+
+class RateLimiter:
+    """Token bucket that hands out at most `rate` requests per second.
+
+    Args:
+        rate (float): Sustained number of requests per second.
+        burst (int): Number of requests that may be issued back to back.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        assert rate > 0, "Request rate has to be positive"
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Keeps one RateLimiter per host, so every site gets its own budget."""
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.limiters: Dict[str, RateLimiter] = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.limiters:
+                self.limiters[host] = RateLimiter(self.rate, self.burst)
+            limiter = self.limiters[host]
+        limiter.acquire()
+
+
+class RateLimitedSession:
+    """Wraps a requests-style session so every `get` first waits for the host budget."""
+    def __init__(self, session, rate_limiter: HostRateLimiter):
+        self.session = session
+        self.rate_limiter = rate_limiter
+
+    def get(self, url: str, **kwargs):
+        self.rate_limiter.acquire(url)
+        return self.session.get(url, **kwargs)
+
+
+def make_session(scraper, metrics: ScrapeMetrics, rate: float) -> RateLimitedSession:
+    """Wraps `scraper` (requests, a requests.Session, cloudscraper) the way every scraper uses it.
+
+    Cache hits never reach the session, so only real requests spend the `rate` budget.
+    Requests are timed inside the limiter, so waiting for budget isn't counted as fetch time.
+    """
+    return RateLimitedSession(InstrumentedSession(scraper, metrics), HostRateLimiter(rate))
+
+
+def fetch_all(fetch: Callable[[Any], Any], items: Iterable[Any],
+              concurrency: int = 4) -> Iterator[Tuple[Any, Any]]:
+    """Runs `fetch` over `items` on a bounded thread pool.
+
+    Rate limiting is left to `fetch` (see HostRateLimiter), so the pool only bounds
+    the number of requests in flight.
+
+    Yields:
+        Tuple[Any, Any]: (item, result) pairs in completion order. Exceptions raised by
+            `fetch` are yielded as the result instead of being raised.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(fetch, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result()
+            except Exception as e:
+                yield item, e
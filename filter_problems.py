@@ -1,47 +1,96 @@
 import re
 import json
 import argparse
-from collections import defaultdict
-from typing import List
+from collections import Counter
+from itertools import groupby
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from filter_rules import RuleSet
+from records import is_jsonl, nested_to_records, read_records, records_to_nested, write_records
+
+RULES = RuleSet()
 
 def load_data(file_dir: str) -> List[dict]:
     with open(file_dir, "r", encoding="utf-8") as data_file:
         data = json.load(data_file)
     return data
 
+def drop_reason(problem_data: dict) -> Optional[Tuple[str, str, str]]:
+    """(rule, field, matched text) for a problem that should be dropped, None to keep it."""
+    if not problem_data.get("name"):
+        return ("missing_name", "name", "")
+    return RULES.dropped_by(problem_data)
+
 def is_valid_problem(problem_data: dict) -> bool:
-    statement = problem_data["statement"]
-    output_format = problem_data["output_format"]
+    return RULES.dropped_by(problem_data) is None
 
-    is_interactive = "interactive" in statement or "interactive" in output_format
-    has_multi_sol = "print any of" in statement or "print any of" in output_format or \
-                    "output any" in statement or "output any" in output_format
-    return False if is_interactive or has_multi_sol else True
+def filter_contest(records: List[dict]) -> List[Tuple[dict, Optional[tuple]]]:
+    """Pairs every record of one contest with its drop reason; runs in the worker processes."""
+    return [(record, drop_reason(record)) for record in records]
 
-def filter_dataset(file_dir: str):
-    data = load_data(file_dir)
+def filter_records(records: Iterable[dict], workers: int = 1,
+                   dropped: List[dict] = None) -> Iterator[dict]:
+    """Streaming version of filter_dataset: yields the named, valid records.
 
-    new_data = defaultdict(dict)
-    for contest in data:
-        for problem in data[contest]:
-            problem_data = data[contest][problem]
-            if problem_data['name']:
-                if contest == "1213" and problem == "A":
-                    print(problem_data)
-                flag = is_valid_problem(problem_data)
-                if flag:
-                    new_data[contest][problem] = problem_data
+    Records are grouped by contest and each contest is checked in a process pool when
+    `workers` > 1; output order is unchanged. Dropped problems are appended to `dropped`
+    together with the rule that dropped them.
+    """
+    contests = (list(group) for _, group in groupby(records, key=lambda record: record["contest_id"]))
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        checked = pool.imap(filter_contest, contests, chunksize=4) if pool else map(filter_contest, contests)
+        for results in checked:
+            for record, reason in results:
+                if reason is None:
+                    yield record
+                elif dropped is not None:
+                    rule, field, matched = reason
+                    dropped.append({"contest_id": record["contest_id"], "problem_key": record["problem_key"],
+                                    "name": record.get("name", ""), "rule": rule, "field": field,
+                                    "match": matched})
+    finally:
+        if pool:
+            pool.terminate()
 
-    with open(f"datafiles/cp_datasetv1.json", "w", encoding="utf-8") as f:
-        json.dump(new_data, f, indent=4, ensure_ascii=False)
+def write_drop_report(report_path: str, dropped: List[dict]) -> None:
+    with open(report_path, "w", encoding="utf-8") as f:
+        for entry in dropped:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    counts = Counter(entry["rule"] for entry in dropped)
+    print(f"Dropped {len(dropped)} problems ({', '.join(f'{rule}: {n}' for rule, n in counts.most_common())}), "
+          f"details in {report_path}")
 
+def filter_dataset(file_dir: str, output_path: str = None, workers: int = 1, report_path: str = None):
+    dropped = []
+    if is_jsonl(file_dir):
+        output_path = output_path or "datafiles/cp_datasetv1.jsonl"
+        kept = write_records(output_path, filter_records(read_records(file_dir), workers, dropped))
+        print(f"Kept {kept} problems in {output_path}")
+    else:
+        output_path = output_path or f"datafiles/cp_datasetv1.json"
+        data = load_data(file_dir)
+        new_data = records_to_nested(filter_records(nested_to_records(data), workers, dropped))
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(new_data, f, indent=4, ensure_ascii=False)
+
+    write_drop_report(report_path or re.sub(r"\.jsonl?$", "", output_path) + "_dropped.jsonl", dropped)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--dir", type=str, required=True,
                        help="Location of csv containing problem info")
+    parser.add_argument("--output", type=str, required=False,
+                       help="Where to write the kept problems (.jsonl streams, .json is the nested layout)")
+
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Processes to filter contests with in parallel")
+    parser.add_argument("--report", type=str, required=False,
+                       help="JSONL listing each dropped problem and the rule that dropped it")
 
     args = parser.parse_args()
 
-    filter_dataset(args.dir)
+    filter_dataset(args.dir, args.output, args.workers, args.report)
     
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""Declarative rule set shared by filter_problems.py and the dashboard.
+
+Each rule names the fields it looks at, a list of plain keywords and/or regexes, and
+an action:
+    exclude  drop the problem if it matches
+    include  keep the problem even if an exclude rule matches
+    flag     only reported (and shown in the dashboard), never drops anything
+
+All rules on a field are compiled into one lookahead alternation, so a field without
+any match is scanned once no matter how many rules there are. At each offset where
+something matched, every rule of the field is then tried on its own, so rules matching
+at the same offset are all found.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FILTER_RULES = [
+    {
+        "name": "interactive",
+        "action": "exclude",
+        "fields": ["statement", "output_format"],
+        "keywords": ["interactive"],
+    },
+    {
+        "name": "multiple_solutions",
+        "action": "exclude",
+        "fields": ["statement", "output_format"],
+        "keywords": ["print any of", "output any"],
+    },
+    {
+        "name": "case_insensitive",
+        "action": "flag",
+        "fields": ["statement", "output_format"],
+        "keywords": ["case-insensitive", "yEs"],
+    },
+    {
+        "name": "valid_solution",
+        "action": "flag",
+        "fields": ["statement", "output_format"],
+        "keywords": ["valid solution"],
+    },
+]
+
+ACTIONS = ("exclude", "include", "flag")
+
+
+def rule_pattern(rule: dict) -> str:
+    alternatives = [re.escape(keyword) for keyword in rule.get("keywords", [])]
+    alternatives += rule.get("regexes", [])
+    if not alternatives:
+        raise ValueError(f"Rule {rule['name']} has no keywords or regexes")
+    pattern = "|".join(alternatives)
+    return pattern if rule.get("case_sensitive", True) else f"(?i:{pattern})"
+
+
+class RuleSet:
+    def __init__(self, rules: List[dict] = FILTER_RULES):
+        self.rules = rules
+        self.field_rules = defaultdict(list)  # field -> [(rule name, compiled pattern)]
+        for rule in rules:
+            if rule["action"] not in ACTIONS:
+                raise ValueError(f"Rule {rule['name']} has unknown action {rule['action']}")
+            pattern = re.compile(rule_pattern(rule))
+            for field in rule["fields"]:
+                self.field_rules[field].append((rule["name"], pattern))
+        # Zero-width lookahead matches, so every offset where some rule matches is visited
+        self.scanners = {field: re.compile("(?=" + "|".join(f"(?:{pattern.pattern})" for _, pattern in patterns) + ")")
+                         for field, patterns in self.field_rules.items()}
+
+    def matches(self, problem_data: dict) -> Dict[str, Tuple[str, str]]:
+        """Rules that match a problem.
+
+        Returns:
+            Dict[str, Tuple[str, str]]: Rule name -> (field, matched text), first match only.
+        """
+        found = {}
+        for field, scanner in self.scanners.items():
+            text = problem_data.get(field) or ""
+            for match in scanner.finditer(text):
+                for name, pattern in self.field_rules[field]:
+                    if name in found:
+                        continue
+                    rule_match = pattern.match(text, match.start())
+                    if rule_match:
+                        found[name] = (field, rule_match.group(0))
+        return found
+
+    def dropped_by(self, problem_data: dict) -> Optional[Tuple[str, str, str]]:
+        """The exclude rule that drops a problem, as (rule, field, matched text), or None to keep it."""
+        found = self.matches(problem_data)
+        by_action = defaultdict(list)
+        for rule in self.rules:
+            if rule["name"] in found:
+                by_action[rule["action"]].append(rule["name"])
+        if by_action["include"] or not by_action["exclude"]:
+            return None
+        name = by_action["exclude"][0]
+        return (name, *found[name])
+
+
+def keywords(rules: Iterable[dict] = FILTER_RULES) -> List[str]:
+    """Every plain keyword in the rule set, in rule order (the dashboard's keyword list)."""
+    seen = []
+    for rule in rules:
+        seen.extend(keyword for keyword in rule.get("keywords", []) if keyword not in seen)
+    return seen
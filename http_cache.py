@@ -0,0 +1,202 @@
+"""Persistent on-disk cache for HTTP GET responses.
+
+Bodies are stored zlib-compressed under the sha256 of their content, so identical
+pages share one blob. A small SQLite index maps each URL to its blob, TTL and
+validators (ETag / Last-Modified). Stale entries are revalidated with a
+conditional request, and the least recently used entries are evicted once the
+blobs exceed `max_bytes`.
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", ".cache/http")
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response, built from a cache entry."""
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str],
+                 content: bytes, encoding: Optional[str]):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = True
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        # Only successful responses are ever cached
+        return None
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 1 << 30,
+                 default_ttl: float = DAY):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at)")
+        self.db.commit()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.z")
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+
+    def _write_blob(self, content: bytes) -> Tuple[str, int]:
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(content, 6))
+            os.replace(tmp_path, path)
+        return digest, os.path.getsize(path)
+
+    def _lookup(self, url: str) -> Optional[tuple]:
+        with self.lock:
+            return self.db.execute(
+                "SELECT status, headers, encoding, digest, etag, last_modified, expires_at "
+                "FROM entries WHERE url = ?", (url,)).fetchone()
+
+    def _touch(self, url: str, expires_at: Optional[float] = None) -> None:
+        with self.lock:
+            if expires_at is None:
+                self.db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            else:
+                self.db.execute("UPDATE entries SET accessed_at = ?, expires_at = ? WHERE url = ?",
+                                (time.time(), expires_at, url))
+            self.db.commit()
+
+    def _store(self, url: str, response, ttl: float) -> None:
+        digest, size = self._write_blob(response.content)
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() in ("content-type", "etag", "last-modified")}
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, json.dumps(headers), response.encoding, digest, size,
+                 response.headers.get("ETag"), response.headers.get("Last-Modified"), now + ttl, now))
+            self.db.commit()
+        self.evict()
+
+    def evict(self) -> None:
+        """Drops least recently used entries until the blobs fit in `max_bytes`."""
+        with self.lock:
+            # Blobs are shared, so the real footprint is the size of the distinct digests
+            total = self.db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for url, digest, size in self.db.execute(
+                    "SELECT url, digest, size FROM entries ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                if not self.db.execute("SELECT 1 FROM entries WHERE digest = ?", (digest,)).fetchone():
+                    try:
+                        os.remove(self._blob_path(digest))
+                    except OSError:
+                        pass
+                    total -= size
+            self.db.commit()
+
+    def get(self, session, url: str, headers: Optional[Dict[str, str]] = None,
+            ttl: Optional[float] = None, **kwargs):
+        """GETs `url` through `session`, answering from the cache whenever possible.
+
+        Args:
+            session: Anything with a requests-style `get` (requests, cloudscraper).
+            url (str): URL to fetch.
+            headers (Dict[str, str], optional): Request headers.
+            ttl (float, optional): Seconds a fresh copy may be served without revalidation.
+
+        Returns:
+            Either a CachedResponse or the live response returned by `session.get`.
+            Only 200 responses are cached.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = self._lookup(url)
+        request_headers = dict(headers or {})
+
+        if entry:
+            status, cached_headers, encoding, digest, etag, last_modified, expires_at = entry
+            content = self._read_blob(digest)
+            if content is not None:
+                cached = CachedResponse(url, status, json.loads(cached_headers), content, encoding)
+                if time.time() < expires_at:
+                    self._touch(url)
+                    return cached
+                if etag:
+                    request_headers["If-None-Match"] = etag
+                if last_modified:
+                    request_headers["If-Modified-Since"] = last_modified
+            else:
+                entry = None
+
+        response = session.get(url, headers=request_headers, **kwargs)
+        if entry and response.status_code == 304:
+            self._touch(url, time.time() + ttl)
+            return cached
+        if response.status_code == 200:
+            self._store(url, response, ttl)
+        return response
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Returns the process-wide cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def cached_get(session, url: str, headers: Optional[Dict[str, str]] = None,
+               ttl: Optional[float] = None, **kwargs):
+    """Shorthand for get_cache().get(...)."""
+    return get_cache().get(session, url, headers=headers, ttl=ttl, **kwargs)
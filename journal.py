@@ -0,0 +1,112 @@
+"""Append-only JSONL journal of scraped problems, so a crashed run can resume"""
+import os
+import json
+import threading
+from typing import Dict, Iterable, Set, Tuple
+
+Key = Tuple[str, str]
+
+
+class ProblemJournal:
+    """One line per extracted problem: {"contest": ..., "index": ..., "data": {...}}.
+
+    Every append is flushed and fsynced before returning, so at most the line that
+    was being written when the process died can be lost. Such a torn line is simply
+    skipped on load.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._drop_torn_tail()
+
+    def _drop_torn_tail(self) -> None:
+        """Cuts off a half-written last line, so new appends start on a fresh line."""
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    f.truncate(pos - step + newline + 1)
+                    return
+                pos -= step
+            f.truncate(0)
+
+    def load(self) -> Dict[Key, dict]:
+        """Returns the journaled problems keyed by (contest, index), in journal order."""
+        return read_journal(self.path)
+
+    def done(self) -> Set[Key]:
+        return set(self.load())
+
+    def append(self, contest_id, problem_id, data: dict) -> None:
+        line = json.dumps({"contest": str(contest_id), "index": str(problem_id), "data": data},
+                          ensure_ascii=False)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def compact(self, output_path: str, contests: Iterable = (), order: Iterable[Key] = (),
+                indent: int = 4) -> Dict[str, Dict[str, dict]]:
+        """Writes the journal out in the nested contest -> problem JSON layout.
+
+        Args:
+            output_path (str): Where to write the nested JSON.
+            contests (Iterable): Contests that should appear, in this order, even if empty.
+            order (Iterable[Key]): Preferred (contest, index) order. Anything else in the
+                journal follows in journal order.
+            indent (int): Indentation passed to json.dump.
+
+        Returns:
+            Dict[str, Dict[str, dict]]: The nested data that was written.
+        """
+        entries = self.load()
+        nested = {}
+        for contest_id in contests:
+            nested.setdefault(str(contest_id), {})
+        for contest_id, problem_id in order:
+            key = (str(contest_id), str(problem_id))
+            if key in entries:
+                nested.setdefault(key[0], {})[key[1]] = entries[key]
+        for (contest_id, problem_id), data in entries.items():
+            nested.setdefault(contest_id, {}).setdefault(problem_id, data)
+
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(nested, f, indent=indent, ensure_ascii=False)
+        os.replace(tmp_path, output_path)
+        return nested
+
+
+def read_journal(path: str) -> Dict[Key, dict]:
+    """Reads a journal without opening it for writing, e.g. one another run still appends to.
+
+    A later line for the same problem replaces the earlier one; torn lines are skipped.
+    """
+    entries = {}
+    if not os.path.isfile(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[(str(record["contest"]), str(record["index"]))] = record["data"]
+    return entries
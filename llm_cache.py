@@ -0,0 +1,42 @@
+"""Persistent cache of validated LLM results, keyed by a hash of the full request"""
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Optional
+
+DEFAULT_CACHE_PATH = "datafiles/llm_cache.sqlite"
+
+
+def request_key(request: dict) -> str:
+    """sha256 over everything that shapes the answer: model, system prompt, problem
+    fields and sampling parameters. Editing any of them gives a new key, so stale
+    results are never reused."""
+    return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+        self.db.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        row = self.db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, model: str, result: dict) -> None:
+        """Stores one result and commits right away, so a crash loses nothing already paid for."""
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                            (key, model, json.dumps(result, ensure_ascii=False), time.time()))
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
@@ -0,0 +1,117 @@
+"""Async worker pool for chat-completion calls with request/token budgets and retries"""
+import time
+import random
+import asyncio
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RequestBudget:
+    """Sliding one-minute window over requests and tokens.
+
+    Each call reserves an estimated token count up front; `settle` swaps the estimate
+    for the real usage once the response is in, so the window tracks actual spend.
+    """
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, window: float = 60.0):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.window = window
+        self.events = deque()  # [timestamp, tokens] per request
+        self.lock = asyncio.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self.events and now - self.events[0][0] >= self.window:
+            self.events.popleft()
+
+    async def acquire(self, tokens: int) -> list:
+        # A single request larger than the whole budget would otherwise wait forever
+        tokens = min(tokens, self.tpm)
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                self._expire(now)
+                used = sum(event[1] for event in self.events)
+                if len(self.events) < self.rpm and used + tokens <= self.tpm:
+                    event = [now, tokens]
+                    self.events.append(event)
+                    return event
+                wait = self.window - (now - self.events[0][0]) if self.events else 0.1
+            await asyncio.sleep(max(wait, 0.05))
+
+    def settle(self, event: list, tokens: int) -> None:
+        event[1] = tokens
+
+
+def status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds to wait according to the error's Retry-After header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS or code >= 500
+    # Connection errors and timeouts carry no status code
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "TimeoutError")
+
+
+async def with_retries(call: Callable[[], Awaitable[Any]], max_retries: int = 5,
+                       base_delay: float = 1.0, max_delay: float = 60.0) -> Any:
+    """Awaits `call()`, retrying 429/5xx and connection errors with exponential backoff.
+
+    A Retry-After header on the error takes precedence over the backoff schedule.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+            print(f"Retrying in {delay:.1f}s after {type(e).__name__} (status {status_code(e)})")
+            await asyncio.sleep(delay)
+
+
+async def run_pool(items: Iterable[Any], worker: Callable[[Any], Awaitable[Any]],
+                   concurrency: int) -> Dict[int, Any]:
+    """Runs `worker` over `items` with at most `concurrency` calls in flight.
+
+    Returns:
+        Dict[int, Any]: Result per item position, so callers can reassemble input order.
+    """
+    queue = asyncio.Queue()
+    for position, item in enumerate(items):
+        queue.put_nowait((position, item))
+    results = {}
+
+    async def drain():
+        while True:
+            try:
+                position, item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            results[position] = await worker(item)
+
+    await asyncio.gather(*(drain() for _ in range(max(1, concurrency))))
+    return results
@@ -1,7 +1,171 @@
 import json
 import os
+import re
+import heapq
+import hashlib
+import argparse
+from itertools import groupby
+from typing import Container, Iterable, Iterator, List, Tuple
+
+from records import JOURNAL_KEYS, is_jsonl, read_records, records_to_nested, write_records
+
+def merge_records(atcoder_records: Iterable[dict], codeforces_records: Iterable[dict]) -> Iterator[dict]:
+    """Streaming version of merge_jsons: stamps each record with its datasource.
+
+    Contest ids are left alone; (datasource, contest_id) is what keeps them apart.
+    """
+    for record in atcoder_records:
+        yield {**record, 'datasource': 'AtC'}
+    for record in codeforces_records:
+        yield {**record, 'datasource': 'CF'}
+
+def natural_key(value: str) -> tuple:
+    """Orders "2" before "10" and "B" before "B1"; digit runs compare as numbers."""
+    parts = re.split(r"(\d+)", str(value))
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(parts))
+
+def problem_key(record: dict) -> tuple:
+    """Stable global id: (datasource, contest, index), independent of which other sources are merged."""
+    return (record.get("datasource", ""), natural_key(record["contest_id"]), natural_key(record["problem_key"]))
+
+def parse_source(spec: str) -> Tuple[str, str]:
+    """"CF=path" -> ("CF", path); a bare path keeps the datasource stored in its records."""
+    datasource, sep, path = spec.partition("=")
+    return (datasource, path) if sep and not os.path.isfile(spec) else ("", spec)
+
+class UnsortedSource(Exception):
+    """Raised while streaming a source that turns out not to be in problem_key order."""
+    def __init__(self, path: str):
+        super().__init__(f"{path} is not sorted by (datasource, contest, index)")
+        self.path = path
+
+def is_journal(path: str) -> bool:
+    """Scraper journals are in scrape order, so there is no point streaming them as sorted."""
+    if not is_jsonl(path) or not os.path.isfile(path):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline().strip()
+    return bool(first) and JOURNAL_KEYS <= json.loads(first).keys()
+
+def source_records(datasource: str, path: str, presorted: bool = True) -> Iterator[dict]:
+    """Records of one source in problem_key order, stamped with `datasource`.
+
+    JSONL is streamed in a single pass and checked on the way; UnsortedSource is raised
+    at the first record out of order. Legacy JSON, and any source with `presorted`
+    False (e.g. a scraper journal), is sorted in memory instead.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"File {path} does not exist.")
+    records = (({**record, "datasource": datasource} if datasource else record) for record in read_records(path))
+    if not presorted or not is_jsonl(path):
+        return iter(sorted(records, key=problem_key))
+
+    def checked():
+        previous = None
+        for record in records:
+            key = problem_key(record)
+            if previous is not None and key < previous:
+                raise UnsortedSource(path)
+            previous = key
+            yield record
+    return checked()
+
+def merge_sources(sources: List[Tuple[str, str]], unsorted: Container[str] = ()) -> Iterator[dict]:
+    """k-way merge of sorted sources. For a key present in several sources, the last source listed wins.
+
+    Paths in `unsorted` are sorted in memory; the others are streamed.
+    """
+    merged = heapq.merge(*(source_records(datasource, path, path not in unsorted) for datasource, path in sources),
+                         key=problem_key)
+    for _, group in groupby(merged, key=problem_key):
+        *_, record = group
+        yield record
+
+def contest_hashes(records: Iterable[dict]) -> Iterator[Tuple[str, str, int, List[dict]]]:
+    """Groups merged records by (datasource, contest) and hashes each contest's content.
+
+    Yields:
+        (datasource\tcontest_id, sha256, problem count, records)
+    """
+    for (datasource, contest_id), group in groupby(records, key=lambda r: (r.get("datasource", ""), r["contest_id"])):
+        problems = list(group)
+        digest = hashlib.sha256(json.dumps(problems, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        yield f"{datasource}\t{contest_id}", digest.hexdigest(), len(problems), problems
+
+def index_path(output_path: str) -> str:
+    return output_path + ".index.json"
+
+def write_merged(sources: List[Tuple[str, str]], output_path: str, previous: dict):
+    """Streams the merge into <output>.tmp, hashing each contest on the way.
+
+    Returns:
+        (contest -> {"sha256", "problems"}, contests whose hash differs from `previous`)
+    """
+    unsorted = {path for _, path in sources if is_journal(path)}
+    while True:
+        contests, changed, nested = {}, [], []
+        try:
+            with open(output_path + ".tmp", "w", encoding="utf-8") as f:
+                for contest, digest, count, problems in contest_hashes(merge_sources(sources, unsorted)):
+                    contests[contest] = {"sha256": digest, "problems": count}
+                    if previous.get(contest, {}).get("sha256") != digest:
+                        changed.append(contest)
+                    if is_jsonl(output_path):
+                        for record in problems:
+                            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    else:
+                        nested.extend(problems)
+                if not is_jsonl(output_path):
+                    json.dump(records_to_nested(nested), f, indent=2, ensure_ascii=False)
+            return contests, changed
+        except UnsortedSource as error:
+            # Start over with that source sorted in memory
+            print(f"{error}, sorting it in memory")
+            unsorted.add(error.path)
+
+def merge_many(sources: List[Tuple[str, str]], output_path: str, skip_unchanged: bool = False) -> None:
+    """Merges any number of sources into `output_path`, sorted by (datasource, contest, index).
+
+    A sidecar <output>.index.json keeps a content hash per contest and lists the
+    contests that changed or disappeared since the previous merge, for the downstream
+    stages. Every source is read and the merge is always rebuilt in full; with
+    `skip_unchanged` the old output is kept (timestamp included) when no contest hash
+    changed, so stages keyed on the file's mtime do not rerun.
+    """
+    sidecar = index_path(output_path)
+    previous = {}
+    if os.path.isfile(sidecar) and os.path.isfile(output_path):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            previous = json.load(f)["contests"]
+
+    # Streamed into a temporary file, so an interrupted merge never leaves a half-written
+    # output; only the legacy nested JSON has to be built in memory
+    contests, changed = write_merged(sources, output_path, previous)
+    removed = [contest for contest in previous if contest not in contests]
+
+    if skip_unchanged and previous and not changed and not removed:
+        os.remove(output_path + ".tmp")
+        print(f"No contest changed since the last merge, {output_path} left as is")
+        return
+    os.replace(output_path + ".tmp", output_path)
+
+    with open(sidecar, "w", encoding="utf-8") as f:
+        json.dump({"sources": [f"{datasource}={path}" if datasource else path for datasource, path in sources],
+                   "contests": contests, "changed": changed, "removed": removed}, f, indent=2)
+    total = sum(entry["problems"] for entry in contests.values())
+    print(f"Merged {total} problems from {len(contests)} contests into {output_path} "
+          f"({len(changed)} changed, {len(removed)} removed)")
 
 def merge_jsons(atcoder_path, codeforces_path, output_path):
+    if any(is_jsonl(path) for path in (atcoder_path, codeforces_path, output_path)):
+        for path in (atcoder_path, codeforces_path):
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"File {path} does not exist.")
+        merged = merge_records(read_records(atcoder_path), read_records(codeforces_path))
+        count = write_records(output_path, merged)
+        print(f"Merged {count} problems into {output_path}")
+        return
+
     # Load AtCoder JSON
     if not os.path.isfile(atcoder_path):
         raise FileNotFoundError(f"AtCoder file {atcoder_path} does not exist.")
@@ -41,8 +205,23 @@ def merge_jsons(atcoder_path, codeforces_path, output_path):
     print(f"Merged {len(merged_data)} contests into {output_path}")
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) != 4:
+    parser = argparse.ArgumentParser(
+        description="Merge problem sources. Legacy form: merge_problems.py <atcoder> <codeforces> <output>")
+    parser.add_argument("legacy", nargs="*", help=argparse.SUPPRESS)
+    parser.add_argument("--source", action="append", default=[],
+                        help="DATASOURCE=path (e.g. CF=datafiles/div3_problems.json), repeatable; "
+                             "a bare path keeps the datasource stored in its records")
+    parser.add_argument("--output", type=str, help="Merged output (.jsonl, or legacy nested .json)")
+    parser.add_argument("--skip-unchanged", action="store_true",
+                        help="Keep the existing output (and its mtime) if no contest's content hash changed")
+    args = parser.parse_args()
+
+    if args.source:
+        if not args.output:
+            parser.error("--output is required with --source")
+        merge_many([parse_source(spec) for spec in args.source], args.output, args.skip_unchanged)
+    elif len(args.legacy) != 3:
         print("Usage: python merge_problems.py <atcoder_json_path> <codeforces_json_path> <output_json_path>")
+        print("   or: python merge_problems.py --source AtC=<path> --source CF=<path> ... --output <path>")
     else:
-        merge_jsons(sys.argv[1], sys.argv[2], sys.argv[3])
\ No newline at end of file
+        merge_jsons(*args.legacy)
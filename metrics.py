@@ -0,0 +1,214 @@
+"""Per-stage timing histograms, HTTP counters and throughput for the scrapers.
+
+Stages:
+    fetch      network round trip of a GET (cache hits never get here)
+    challenge  extra time cloudscraper spent solving a Cloudflare challenge
+    parse      HTML/JSON parsing
+    extract    turning the parsed page into problem data
+    serialize  journal appends, compaction and CSV/index writes
+
+At the end of a run `write()` leaves datafiles/metrics/<job>.json (summary) and
+datafiles/metrics/<job>.prom (Prometheus text format, e.g. for node_exporter's
+textfile collector).
+"""
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+DEFAULT_METRICS_DIR = "datafiles/metrics"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGES = ("fetch", "challenge", "parse", "extract", "serialize")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in seconds, as Prometheus expects."""
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max for the +Inf bucket)."""
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 6),
+            "mean_seconds": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50_seconds": round(self.quantile(0.5), 6),
+            "p95_seconds": round(self.quantile(0.95), 6),
+            "max_seconds": round(self.max, 6),
+        }
+
+
+class ScrapeMetrics:
+    """Thread-safe metrics of one scraping job (codeforces, atcoder, dataset)."""
+    def __init__(self, job: str):
+        self.job = job
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self.status = Counter()
+        self.events = Counter()
+        self.bytes = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.stages.setdefault(stage, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, event: str, n: int = 1) -> None:
+        with self.lock:
+            self.events[event] += n
+
+    def record_response(self, response) -> None:
+        """Counts a network response by status code and adds its body size."""
+        with self.lock:
+            self.status[str(response.status_code)] += 1
+            self.bytes += len(response.content or b"")
+
+    def record_lookup(self, response) -> None:
+        """Counts what cached_get returned as a cache hit or miss (revalidated 304s are hits)."""
+        self.count("cache_hits" if getattr(response, "from_cache", False) else "cache_misses")
+
+    def summary(self) -> dict:
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            requests = sum(self.status.values())
+            return {
+                "job": self.job,
+                "started_at": self.started,
+                "elapsed_seconds": round(elapsed, 3),
+                "stages": {stage: histogram.summary() for stage, histogram in self.stages.items()},
+                "http_status": dict(self.status),
+                "events": dict(self.events),
+                "bytes": self.bytes,
+                "throughput": {
+                    "requests_per_second": round(requests / elapsed, 3),
+                    "bytes_per_second": round(self.bytes / elapsed, 1),
+                    "problems_per_second": round(self.events.get("problems", 0) / elapsed, 3),
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        job = f'job="{self.job}"'
+        lines = [
+            "# HELP astradata_stage_seconds Time spent per scraping stage",
+            "# TYPE astradata_stage_seconds histogram",
+        ]
+        with self.lock:
+            for stage, histogram in self.stages.items():
+                labels = f'{job},stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'astradata_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"astradata_stage_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"astradata_stage_seconds_count{{{labels}}} {histogram.count}")
+
+            lines += ["# HELP astradata_http_responses_total Network responses by status code",
+                      "# TYPE astradata_http_responses_total counter"]
+            lines += [f'astradata_http_responses_total{{{job},status="{status}"}} {count}'
+                      for status, count in sorted(self.status.items())]
+            lines += ["# HELP astradata_http_bytes_total Response bytes received over the network",
+                      "# TYPE astradata_http_bytes_total counter",
+                      f"astradata_http_bytes_total{{{job}}} {self.bytes}"]
+            lines += ["# HELP astradata_events_total Scraper events (cache hits, problems, errors, ...)",
+                      "# TYPE astradata_events_total counter"]
+            lines += [f'astradata_events_total{{{job},event="{event}"}} {count}'
+                      for event, count in sorted(self.events.items())]
+            lines += ["# HELP astradata_run_seconds Wall time of the run",
+                      "# TYPE astradata_run_seconds gauge",
+                      f"astradata_run_seconds{{{job}}} {time.time() - self.started:.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: str = DEFAULT_METRICS_DIR) -> Tuple[str, str]:
+        """Writes <job>.json and <job>.prom, each replaced atomically.
+
+        Returns:
+            Tuple[str, str]: Paths of the JSON summary and the Prometheus file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        summary = self.summary()
+        paths = (os.path.join(directory, f"{self.job}.json"), os.path.join(directory, f"{self.job}.prom"))
+        for path, text in zip(paths, (json.dumps(summary, indent=2), self.to_prometheus())):
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(path + ".tmp", path)
+
+        fetch = summary["stages"]["fetch"]
+        print(f"Metrics: {fetch['count']} requests, {summary['bytes'] / 1e6:.1f} MB, "
+              f"{summary['throughput']['requests_per_second']} req/s, "
+              f"{summary['events'].get('cache_hits', 0)} cache hits, saved to {paths[0]} and {paths[1]}")
+        return paths
+
+
+class InstrumentedSession:
+    """Wraps a requests-style session (or the requests module) to time and count every GET.
+
+    For cloudscraper sessions each raw round trip is timed too: the first one is the
+    fetch, anything beyond it within the same GET is challenge solving. To do that, the
+    constructor replaces `perform_request` on the session instance it is given with a
+    timed wrapper, so that instance stays instrumented even when used directly.
+    """
+    def __init__(self, session, metrics: ScrapeMetrics):
+        self.session = session
+        self.metrics = metrics
+        self.local = threading.local()
+        perform_request = getattr(session, "perform_request", None)
+        if perform_request is not None:
+            def timed_perform_request(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return perform_request(*args, **kwargs)
+                finally:
+                    trips = getattr(self.local, "trips", None)
+                    if trips is not None:
+                        trips.append(time.perf_counter() - start)
+            session.perform_request = timed_perform_request
+
+    def get(self, url: str, **kwargs):
+        self.local.trips = []
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception:
+            self.metrics.count("request_errors")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            trips, self.local.trips = self.local.trips, None
+            fetch = trips[0] if trips else elapsed
+            self.metrics.observe("fetch", fetch)
+            if len(trips) > 1:
+                self.metrics.observe("challenge", elapsed - fetch)
+                self.metrics.count("challenges")
+        self.metrics.record_response(response)
+        return response
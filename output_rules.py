@@ -0,0 +1,105 @@
+"""Rule-based removal of the case-insensitive output boilerplate.
+
+Most problems flagged for normalization carry one of a few templated sentences, e.g.
+    You can output the answer in any case (upper or lower). For example, the strings
+    " yEs ", " yes ", " Yes ", and " YES " will be recognized as positive responses.
+followed by the yEs/yes/Yes/YES lines the scraper pulls out of the quoted spans.
+These are rewritten locally; anything the rules can't fully clean is left to the LLM.
+"""
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+# Sentences that only exist to say the answer is case-insensitive, one named group each
+BOILERPLATE_RULES = (
+    ("any_case", r"You (?:can|may) (?:output|print|return)[^.\n]*?"
+                 r"(?:in any (?:case|register)|\(upper or lower\))[^.\n]*(?:\.|$)"),
+    ("letter_any_case", r"(?:Each|Every|All) (?:letters?|characters?)[^.\n]*?"
+                        r"(?:in any (?:case|register)|\(upper or lower\))[^.\n]*(?:\.|$)"),
+    ("recognized_example", r"For example,? (?:the )?strings?[^.\n]*?"
+                           r"(?:will be|are) (?:recognized|accepted|considered)[^.\n]*(?:\.|$)"),
+    ("recognized_parenthesized", r"\((?:for example|e\.g\.),?[^()\n]*?"
+                                 r"(?:recognized|accepted|considered)[^()\n]*\)\.?"),
+)
+BOILERPLATE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in BOILERPLATE_RULES))
+
+# The quoted variants echoed on their own lines around the sentence
+ECHO_LINE = re.compile(r"\s*(?:yes|no)\s*", re.IGNORECASE)
+# "For example, the strings ... are considered ..." is only boilerplate when it lists the answers
+EXAMPLE_RULES = {"recognized_example", "recognized_parenthesized"}
+YES_NO = re.compile(r"\b(?:yes|no)\b", re.IGNORECASE)
+
+# Anything still hinting at case-insensitivity means the rules missed a variant
+RESIDUE = re.compile(r"yEs|(?i:any case|any register|upper or lower|case[- ]insensitive)")
+
+EDITABLE_FIELDS = ("statement", "output_format")
+
+
+def rewrite_text(text: str, strict: bool = False) -> Tuple[str, List[str], List[str]]:
+    """Strips boilerplate sentences and the echo lines around them.
+
+    Example rules only remove a sentence that names the yes/no answers. With `strict`
+    (used for statements), every rule needs that; any other match without them is kept
+    and reported as unsure instead.
+
+    Returns:
+        Tuple[str, List[str], List[str]]: Rewritten text, the rules that fired and the
+        rules that matched but were not applied.
+    """
+    changes, unsure, lines = [], [], []
+    after_boilerplate = False
+    for line in text.split("\n"):
+        if after_boilerplate and ECHO_LINE.fullmatch(line):
+            changes.append("echo_line")
+            continue
+
+        fired = []
+
+        def drop(match):
+            if not YES_NO.search(match.group(0)) and (strict or match.lastgroup in EXAMPLE_RULES):
+                # An example sentence without the answers is ordinary problem text
+                if strict and match.lastgroup not in EXAMPLE_RULES:
+                    unsure.append(match.lastgroup)
+                return match.group(0)
+            fired.append(match.lastgroup)
+            return ""
+
+        rewritten = BOILERPLATE.sub(drop, line)
+        after_boilerplate = bool(fired)
+        if not fired:
+            lines.append(line)
+            continue
+        changes.extend(fired)
+        # Echo lines right before the sentence belong to it too
+        while lines and ECHO_LINE.fullmatch(lines[-1]):
+            lines.pop()
+            changes.append("echo_line")
+        rewritten = re.sub(r"[ \t]{2,}", " ", rewritten).strip()
+        if rewritten:
+            lines.append(rewritten)
+    return "\n".join(lines).strip(), changes, unsure
+
+
+def rewrite_problem(problem_data: dict) -> Optional[Tuple[dict, List[str]]]:
+    """Rewrites statement and output_format of one problem.
+
+    Returns:
+        Optional[Tuple[dict, List[str]]]: The rewritten copy and "field:rule" changes, or
+        None when no rule applied, a statement sentence matched without naming the
+        yes/no answers, or some case-insensitivity wording survived.
+    """
+    result, changes = dict(problem_data), []
+    for field in EDITABLE_FIELDS:
+        text = problem_data.get(field, "")
+        # Statements are problem text first, so only sentences naming the answers are cut there
+        rewritten, fired, unsure = rewrite_text(text, strict=field == "statement")
+        if unsure or RESIDUE.search(rewritten):
+            return None
+        if fired:
+            result[field] = rewritten
+            changes.extend(f"{field}:{rule}" for rule in fired)
+    return (result, changes) if changes else None
+
+
+def summarize(changes: Counter) -> str:
+    return ", ".join(f"{rule} x{count}" for rule, count in changes.most_common())
@@ -0,0 +1,98 @@
+"""Incremental SQLite index of Codeforces contests and problems"""
+import time
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_INDEX_PATH = "datafiles/problem_index.sqlite"
+
+
+class ProblemIndex:
+    """Contests and problems seen so far, keyed by contestId and (contestId, index).
+
+    A contest is only recorded once its problems were fetched, so anything missing
+    from the index is exactly what a refresh still has to query. Scrapers mark
+    problems as scraped, which lets them ask for the ones that are still pending.
+    """
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS contests (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                start_time INTEGER,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS problems (
+                contest_id INTEGER NOT NULL REFERENCES contests (id),
+                idx TEXT NOT NULL,
+                name TEXT NOT NULL,
+                rating INTEGER,
+                tags TEXT,
+                scraped_at REAL,
+                PRIMARY KEY (contest_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self.db.commit()
+
+    def known_contest_ids(self) -> Set[int]:
+        return {row[0] for row in self.db.execute("SELECT id FROM contests")}
+
+    def watermark(self) -> Optional[float]:
+        """Time of the last refresh that added contests, or None for an empty index."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'last_seen'").fetchone()
+        return float(row[0]) if row else None
+
+    def add_contest(self, contest: dict, rows: List[dict]) -> None:
+        """Records a contest and its problem rows (as built by dataset.problem_row)."""
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO contests VALUES (?, ?, ?, ?)",
+                (contest['id'], contest['name'], contest.get('startTimeSeconds'), now))
+            # Keep scraped_at for problems that were already indexed
+            self.db.executemany(
+                "INSERT INTO problems (contest_id, idx, name, rating, tags) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (contest_id, idx) DO UPDATE SET "
+                "name = excluded.name, rating = excluded.rating, tags = excluded.tags",
+                [(contest['id'], row['index'], row['name'], row.get('rating'), row.get('tags', ''))
+                 for row in rows])
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('last_seen', ?)", (str(now),))
+
+    def problems(self, contest_ids: Iterable[int], pending_only: bool = False) -> List[dict]:
+        """Problem rows for `contest_ids`, in that contest order and by index within a contest."""
+        contest_ids = list(contest_ids)
+        order = {contest_id: i for i, contest_id in enumerate(contest_ids)}
+        query = "SELECT contest_id, idx, name, rating, tags FROM problems"
+        if pending_only:
+            query += " WHERE scraped_at IS NULL"
+        rows = [
+            {"contestId": contest_id, "index": idx, "name": name, "rating": rating, "tags": tags}
+            for contest_id, idx, name, rating, tags in self.db.execute(query)
+            if contest_id in order
+        ]
+        rows.sort(key=lambda row: (order[row['contestId']], row['index']))
+        return rows
+
+    def pending_problems(self, contest_ids: Iterable[int]) -> List[dict]:
+        """Problems of `contest_ids` that no scraper has marked as scraped yet."""
+        return self.problems(contest_ids, pending_only=True)
+
+    def scraped(self) -> Set[Tuple[int, str]]:
+        return {(contest_id, idx) for contest_id, idx in
+                self.db.execute("SELECT contest_id, idx FROM problems WHERE scraped_at IS NOT NULL")}
+
+    def mark_scraped(self, contest_id: int, index: str) -> None:
+        with self.db:
+            self.db.execute("UPDATE problems SET scraped_at = ? WHERE contest_id = ? AND idx = ?",
+                            (time.time(), int(contest_id), str(index)))
+
+    def stats(self) -> Dict[str, int]:
+        contests = self.db.execute("SELECT COUNT(*) FROM contests").fetchone()[0]
+        problems, pending = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(scraped_at IS NULL), 0) FROM problems").fetchone()
+        return {"contests": contests, "problems": problems, "pending": pending}
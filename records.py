@@ -0,0 +1,119 @@
+"""Streaming record format for the post-processing stages.
+
+One problem per line (JSONL), each line a flat dict:
+    {"contest_id": ..., "problem_key": ..., "datasource": ..., "name": ..., "statement": ..., ...}
+
+Readers are generators and writers consume iterables, so filter, merge and split can
+run in constant memory. The legacy nested contest -> problem JSON can be converted in
+both directions; reading it still loads that one file, since plain JSON can't be
+streamed with the standard library.
+"""
+import os
+import json
+import sys
+from typing import Dict, Iterable, Iterator, Tuple
+
+RECORD_KEYS = ("contest_id", "problem_key", "datasource")
+# Keys of a scraper journal line, which read_records converts into a record
+JOURNAL_KEYS = {"contest", "index", "data"}
+
+
+def problem_to_record(contest_id, problem_key, problem_data: dict) -> dict:
+    record = {
+        "contest_id": str(contest_id),
+        "problem_key": str(problem_key),
+        "datasource": problem_data.get("datasource", ""),
+    }
+    record.update((k, v) for k, v in problem_data.items() if k != "datasource")
+    return record
+
+
+def record_to_problem(record: dict) -> Tuple[str, str, dict]:
+    """Inverse of problem_to_record. An empty datasource is dropped, as before merging."""
+    problem_data = {k: v for k, v in record.items() if k not in RECORD_KEYS}
+    if record.get("datasource"):
+        problem_data["datasource"] = record["datasource"]
+    return record["contest_id"], record["problem_key"], problem_data
+
+
+def journal_to_record(entry: dict) -> dict:
+    """A scraper journal line ({"contest", "index", "data"}, see journal.py) as a record."""
+    return problem_to_record(entry["contest"], entry["index"], entry["data"])
+
+
+def nested_to_records(data: Dict[str, Dict[str, dict]]) -> Iterator[dict]:
+    for contest_id, problems in data.items():
+        for problem_key, problem_data in problems.items():
+            yield problem_to_record(contest_id, problem_key, problem_data)
+
+
+def records_to_nested(records: Iterable[dict]) -> Dict[str, Dict[str, dict]]:
+    """Builds the legacy nested layout.
+
+    A contest id that already belongs to another datasource gets that datasource as a
+    prefix (CF_1234), the way merge_problems used to resolve collisions.
+    """
+    nested, owner = {}, {}
+    for record in records:
+        contest_id, problem_key, problem_data = record_to_problem(record)
+        datasource = record.get("datasource", "")
+        key = contest_id
+        if owner.setdefault(key, datasource) != datasource:
+            key = f"{datasource}_{contest_id}"
+        nested.setdefault(key, {})[problem_key] = problem_data
+    return nested
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith(".jsonl")
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Yields records from a JSONL file (records or a scraper journal), or from a legacy
+    nested JSON file. A problem journaled twice comes out twice, latest last."""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"The file {path} does not exist.")
+    if not is_jsonl(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from nested_to_records(data)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield journal_to_record(record) if JOURNAL_KEYS.issubset(record) else record
+
+
+def write_records(path: str, records: Iterable[dict]) -> int:
+    """Writes records as JSONL, or as legacy nested JSON if `path` doesn't end in .jsonl.
+
+    Returns:
+        int: Number of records written.
+    """
+    if not is_jsonl(path):
+        count = [0]
+
+        def counted():
+            for record in records:
+                count[0] += 1
+                yield record
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records_to_nested(counted()), f, indent=2, ensure_ascii=False)
+        return count[0]
+
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python records.py <input.json|input.jsonl> <output.jsonl|output.json>")
+    else:
+        written = write_records(sys.argv[2], read_records(sys.argv[1]))
+        print(f"Converted {written} problems from {sys.argv[1]} to {sys.argv[2]}")
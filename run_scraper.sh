@@ -12,6 +12,7 @@ PYTHONUNBUFFERED=1 \
 python codeforces.py \
     --div=$div \
     --dir="datafiles/div$div.csv" \
+    --index="datafiles/problem_index.sqlite" \
     2>&1 | tee -a scraper.log
 
 PYTHONUNBUFFERED=1 \
@@ -0,0 +1,146 @@
+"""SQLite FTS5 full-text index over problems, used by the dashboard's search box.
+
+One row per problem with a column per text field, so queries can target fields and
+combine them with FTS5 syntax, e.g.
+    output_format:"any case" NOT statement:"any case"
+    interactive OR "print any of"
+    name:tree* AND statement:(query NEAR/5 subtree)
+Results are ranked with bm25 (name and statement weigh more) and can be restricted
+to one datasource.
+
+Usage:
+    python search_index.py --data datafiles/merged.jsonl --db datafiles/search.sqlite
+    python search_index.py --db datafiles/search.sqlite --query 'output_format:"any case"' --datasource AtC
+"""
+import os
+import json
+import sqlite3
+import argparse
+from typing import Iterable, List, Optional, Tuple
+
+from records import read_records
+
+KEY_COLUMNS = ("contest_id", "problem_key", "datasource")
+TEXT_FIELDS = ("name", "statement", "input_format", "output_format", "examples", "notes")
+FIELD_WEIGHTS = {"name": 3.0, "statement": 2.0, "input_format": 1.0, "output_format": 1.0,
+                 "examples": 0.5, "notes": 0.5}
+# bm25 takes one weight per column, in table order; the UNINDEXED key columns get 0
+BM25_WEIGHTS = (0.0,) * len(KEY_COLUMNS) + tuple(FIELD_WEIGHTS[field] for field in TEXT_FIELDS)
+DEFAULT_INDEX_DIR = os.path.join(".cache", "search")
+
+
+def examples_text(examples) -> str:
+    if isinstance(examples, str):
+        return examples
+    lines = []
+    for example in examples or []:
+        for part in ("input", "output"):
+            value = example.get(part, [])
+            lines.extend(value if isinstance(value, list) else [str(value)])
+    return "\n".join(lines)
+
+
+def row_values(record: dict) -> tuple:
+    """Accepts records (problem_key) as well as dashboard rows (problem_id)."""
+    return (
+        str(record.get("contest_id", "")),
+        str(record.get("problem_key", record.get("problem_id", ""))),
+        record.get("datasource", "") or "",
+        *(examples_text(record.get(field)) if field == "examples" else str(record.get(field) or "")
+          for field in TEXT_FIELDS),
+    )
+
+
+def build_index(records: Iterable[dict], db_path: str, batch_size: int = 2000) -> int:
+    """(Re)builds the FTS5 table at `db_path`.
+
+    Returns:
+        int: Number of problems indexed.
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    db.execute(f"""
+        CREATE VIRTUAL TABLE problems USING fts5(
+            {", ".join(f"{column} UNINDEXED" for column in KEY_COLUMNS)},
+            {", ".join(TEXT_FIELDS)},
+            tokenize = 'unicode61'
+        )""")
+    placeholders = ", ".join("?" * len(BM25_WEIGHTS))
+    count, batch = 0, []
+    with db:
+        for record in records:
+            batch.append(row_values(record))
+            if len(batch) >= batch_size:
+                db.executemany(f"INSERT INTO problems VALUES ({placeholders})", batch)
+                count += len(batch)
+                batch = []
+        db.executemany(f"INSERT INTO problems VALUES ({placeholders})", batch)
+        count += len(batch)
+        db.execute("INSERT INTO problems(problems) VALUES('optimize')")
+    db.close()
+    # Swapped in whole, so a reader never sees a half-built index
+    os.replace(tmp_path, db_path)
+    return count
+
+
+def index_for(rows: List[dict], file_hash: str, index_dir: str = DEFAULT_INDEX_DIR) -> str:
+    """Path of the index for one dataset file, built on first use."""
+    db_path = os.path.join(index_dir, f"{file_hash}.sqlite")
+    if not os.path.isfile(db_path):
+        build_index(rows, db_path)
+    return db_path
+
+
+def datasources(db_path: str) -> List[str]:
+    with sqlite3.connect(db_path) as db:
+        return [row[0] for row in db.execute("SELECT DISTINCT datasource FROM problems ORDER BY 1")]
+
+
+def search(db_path: str, query: str, datasource: Optional[str] = None, limit: int = 20,
+           offset: int = 0) -> Tuple[int, List[dict]]:
+    """Runs an FTS5 MATCH query, best bm25 score first.
+
+    Raises sqlite3.OperationalError on malformed query syntax.
+
+    Returns:
+        Tuple[int, List[dict]]: Total number of matches and one page of results.
+    """
+    where, params = "problems MATCH ?", [query]
+    if datasource:
+        where += " AND datasource = ?"
+        params.append(datasource)
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+    with sqlite3.connect(db_path) as db:
+        total = db.execute(f"SELECT COUNT(*) FROM problems WHERE {where}", params).fetchone()[0]
+        cursor = db.execute(f"""
+            SELECT contest_id, problem_key, datasource, name,
+                   snippet(problems, -1, '[', ']', '...', 16) AS snippet,
+                   bm25(problems, {weights}) AS score
+            FROM problems WHERE {where}
+            ORDER BY score LIMIT ? OFFSET ?""", params + [limit, offset])
+        columns = [column[0] for column in cursor.description]
+        return total, [dict(zip(columns, row)) for row in cursor]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the FTS5 problem index.")
+    parser.add_argument("--db", type=str, required=True, help="SQLite index path")
+    parser.add_argument("--data", type=str, help="Problems to (re)index (.jsonl or legacy .json)")
+    parser.add_argument("--query", type=str, help="FTS5 query, e.g. 'output_format:\"any case\" NOT statement:\"any case\"'")
+    parser.add_argument("--datasource", type=str, help="Only return problems from this datasource")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--offset", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.data:
+        print(f"Indexed {build_index(read_records(args.data), args.db)} problems into {args.db}")
+    if args.query:
+        total, results = search(args.db, args.query, args.datasource, args.limit, args.offset)
+        print(f"{total} matches")
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
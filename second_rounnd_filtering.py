@@ -1,15 +1,20 @@
 import json
 import argparse
-from collections import defaultdict
-from typing import List
+from collections import Counter, defaultdict
+from typing import Callable, List
 import jsonschema
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq, Groq
 import time
+import asyncio
+
+from llm_cache import DEFAULT_CACHE_PATH, LLMCache, request_key
+from llm_pool import RequestBudget, run_pool, with_retries
+from output_rules import rewrite_problem, summarize
 
 load_dotenv()
 
-# Initialize Groq client
+# Initialize Groq client (GROQ_BASE_URL points both clients at a compatible stub server)
 client = Groq()
 
 # Define JSON schema for problem data
@@ -59,68 +64,268 @@ def validate_json(result_json: dict) -> bool:
         print(f"JSON validation failed: {e}")
         return False
 
-def get_new_problem_data(problem_data: dict) -> dict:
-    """Process problem data via Groq API to normalize case-insensitive responses."""
-    try:
-        completion = client.chat.completions.create(
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        """You are given a competitive programming problem. Your task is to preprocess the problem data. "
+MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+
+SYSTEM_PROMPT = (
+    """You are given a competitive programming problem. Your task is to preprocess the problem data. "
                         "Do not solve the problem. Remove references to case-insensitive output in the 'statement' and "
                         "'output_format' fields, ensuring only a single solution format remains (e.g., 'YES' instead of "
                         "allowing 'yes', 'Yes', etc.). Return the modified problem data in JSON format.
                         "Some of these problems are saying that you can output multiple solutions, but I want this to be a single solution. The only fields you should consider changing are the statement and/or the output_format fields. \n\nRemove references for mention of case-insensivity. \n\nAs an example input, \n{\n            \"name\": \"A. False Alarm\",\n            \"statement\": \"Yousef is at the entrance of a long hallway with $$$n$$$ doors in a row, numbered from $$$1$$$ to $$$n$$$. He needs to pass through all the doors from $$$1$$$ to $$$n$$$ in order of numbering and reach the exit (past door $$$n$$$).\\nEach door can be open or closed. If a door is open, Yousef passes through it in $$$1$$$ second. If the door is closed, Yousef can't pass through it.\\nHowever, Yousef has a special button which he can use at most once at any moment. This button makes all closed doors become open for $$$x$$$ seconds.\\nYour task is to determine if Yousef can pass through all the doors if he can use the button at most once.\",\n            \"input_format\": \"Input\\nThe first line of the input contains an integer $$$t$$$ ($$$1 \\\\le t \\\\le 1000$$$) — the number of test cases.\\nThe first line of each test case contains two integers $$$n, x$$$ ($$$1 \\\\le n, x \\\\le 10$$$) — the number of doors and the number of seconds of the button, respectively.\\nThe second line of each test case contains $$$n$$$ integers $$$a_1, a_2, ..., a_n$$$ ($$$a_i \\\\in \\\\{0, 1\\\\}$$$) — the state of each door. Open doors are represented by '0' , while closed doors are represented by '1' .\\n'0'\\n'1'\\nIt is guaranteed that each test case contains at least one closed door.\",\n            \"output_format\": \"Output\\nFor each test case, output \\\" YES \\\" if Yousef can reach the exit, and \\\" NO \\\" otherwise.\\nYES\\nNO\\nYou can output the answer in any case (upper or lower). For example, the strings \\\" yEs \\\", \\\" yes \\\", \\\" Yes \\\", and \\\" YES \\\" will be recognized as positive responses.\\nyEs\\nyes\\nYes\\nYES\",\n            \"examples\": [\n                {\n                    \"input\": [\n                        \"7\",\n                        \"4 2\",\n                        \"0 1 1 0\",\n                        \"6 3\",\n                        \"1 0 1 1 0 0\",\n                        \"8 8\",\n                        \"1 1 1 0 0 1 1 1\",\n                        \"1 2\",\n                        \"1\",\n                        \"5 1\",\n                        \"1 0 1 0 1\",\n                        \"7 4\",\n                        \"0 0 0 1 1 0 1\",\n                        \"10 3\",\n                        \"0 1 0 0 1 0 0 1 0 0\"\n                    ],\n                    \"output\": [\n                        \"YES\",\n                        \"NO\",\n                        \"YES\",\n                        \"YES\",\n                        \"NO\",\n                        \"YES\",\n                        \"NO\"\n                    ]\n                }\n            ],\n            \"notes\": \"Note\\nIn the first test case, the optimal way is as follows:\\nAt time $$$0$$$, the door is open, so Yousef passes. At time $$$1$$$, the door is closed, Yousef can use the button now and pass through the door. At time $$$2$$$, the button's effect is still on, so Yousef can still pass. At time $$$3$$$, the button's effect has finished, but the door is open. Yousef passes and reaches the exit.\\nAt time $$$0$$$, the door is open, so Yousef passes.\\nAt time $$$1$$$, the door is closed, Yousef can use the button now and pass through the door.\\nAt time $$$2$$$, the button's effect is still on, so Yousef can still pass.\\nAt time $$$3$$$, the button's effect has finished, but the door is open. Yousef passes and reaches the exit.\\nIn the second test case, Yousef has a 3-second button, but he would need at least a 4-second button to reach the exit. Therefore, the answer is NO .\\nNO\\nIn the third test case, Yousef can turn on the button before starting to move. All the doors will stay open until he reaches the exit.\",\n            \"datasource\": \"CF\"\n        },\n\nExample Output: \n{\n            \"name\": \"A. False Alarm\",\n            \"statement\": \"Yousef is at the entrance of a long hallway with $$$n$$$ doors in a row, numbered from $$$1$$$ to $$$n$$$. He needs to pass through all the doors from $$$1$$$ to $$$n$$$ in order of numbering and reach the exit (past door $$$n$$$).\\nEach door can be open or closed. If a door is open, Yousef passes through it in $$$1$$$ second. If the door is closed, Yousef can't pass through it.\\nHowever, Yousef has a special button which he can use at most once at any moment. This button makes all closed doors become open for $$$x$$$ seconds.\\nYour task is to determine if Yousef can pass through all the doors if he can use the button at most once.\",\n            \"input_format\": \"Input\\nThe first line of the input contains an integer $$$t$$$ ($$$1 \\\\le t \\\\le 1000$$$) — the number of test cases.\\nThe first line of each test case contains two integers $$$n, x$$$ ($$$1 \\\\le n, x \\\\le 10$$$) — the number of doors and the number of seconds of the button, respectively.\\nThe second line of each test case contains $$$n$$$ integers $$$a_1, a_2, ..., a_n$$$ ($$$a_i \\\\in \\\\{0, 1\\\\}$$$) — the state of each door. Open doors are represented by '0' , while closed doors are represented by '1' .\\n'0'\\n'1'\\nIt is guaranteed that each test case contains at least one closed door.\",\n            \"output_format\": \"Output\\nFor each test case, output \\\" YES \\\" if Yousef can reach the exit, and \\\" NO \\\" otherwise.\n            \"examples\": [\n                {\n                    \"input\": [\n                        \"7\",\n                        \"4 2\",\n                        \"0 1 1 0\",\n                        \"6 3\",\n                        \"1 0 1 1 0 0\",\n                        \"8 8\",\n                        \"1 1 1 0 0 1 1 1\",\n                        \"1 2\",\n                        \"1\",\n                        \"5 1\",\n                        \"1 0 1 0 1\",\n                        \"7 4\",\n                        \"0 0 0 1 1 0 1\",\n                        \"10 3\",\n                        \"0 1 0 0 1 0 0 1 0 0\"\n                    ],\n                    \"output\": [\n                        \"YES\",\n                        \"NO\",\n                        \"YES\",\n                        \"YES\",\n                        \"NO\",\n                        \"YES\",\n                        \"NO\"\n                    ]\n                }\n            ],\n            \"notes\": \"Note\\nIn the first test case, the optimal way is as follows:\\nAt time $$$0$$$, the door is open, so Yousef passes. At time $$$1$$$, the door is closed, Yousef can use the button now and pass through the door. At time $$$2$$$, the button's effect is still on, so Yousef can still pass. At time $$$3$$$, the button's effect has finished, but the door is open. Yousef passes and reaches the exit.\\nAt time $$$0$$$, the door is open, so Yousef passes.\\nAt time $$$1$$$, the door is closed, Yousef can use the button now and pass through the door.\\nAt time $$$2$$$, the button's effect is still on, so Yousef can still pass.\\nAt time $$$3$$$, the button's effect has finished, but the door is open. Yousef passes and reaches the exit.\\nIn the second test case, Yousef has a 3-second button, but he would need at least a 4-second button to reach the exit. Therefore, the answer is NO .\\nNO\\nIn the third test case, Yousef can turn on the button before starting to move. All the doors will stay open until he reaches the exit.\",\n            \"datasource\": \"CF\"\n        },"
                         """
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Solve and return in json mode\n{json.dumps(problem_data)}"
-                },
-            ],
-            temperature=1,
-            max_completion_tokens=2048,
-            top_p=1,
-            stream=False,
-            response_format={"type": "json_object"},
-            stop=None,
-        )
-        result = json.loads(completion.choices[0].message.content)
-        if validate_json(result):
-            return result
-        else:
-            print(f"Skipping invalid response for problem: {problem_data['name']}")
-            return None
+)
+
+SAMPLING = {
+    "temperature": 1,
+    "max_completion_tokens": 2048,
+    "top_p": 1,
+}
+
+def build_request(problem_data: dict) -> dict:
+    """Keyword arguments for chat.completions.create, shared by the sync and async paths."""
+    return {
+        "model": MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": f"Solve and return in json mode\n{json.dumps(problem_data)}"
+            },
+        ],
+        **SAMPLING,
+        "stream": False,
+        "response_format": {"type": "json_object"},
+        "stop": None,
+    }
+
+def parse_completion(completion, problem_data: dict) -> dict:
+    result = json.loads(completion.choices[0].message.content)
+    if validate_json(result):
+        return result
+    else:
+        print(f"Skipping invalid response for problem: {problem_data['name']}")
+        return None
+
+# Only these two fields are ever edited, so the lean mode sends and receives nothing else
+EDITABLE_FIELDS = ("statement", "output_format")
+
+LEAN_EXAMPLE_INPUT = {
+    "statement": "Yousef is at the entrance of a long hallway with $$$n$$$ doors in a row. "
+                 "Your task is to determine if Yousef can pass through all the doors if he can use the button at most once.",
+    "output_format": "Output\nFor each test case, output \" YES \" if Yousef can reach the exit, and \" NO \" otherwise.\n"
+                     "YES\nNO\nYou can output the answer in any case (upper or lower). For example, the strings "
+                     "\" yEs \", \" yes \", \" Yes \", and \" YES \" will be recognized as positive responses.\nyEs\nyes\nYes\nYES",
+}
+LEAN_EXAMPLE_OUTPUT = {
+    "statement": LEAN_EXAMPLE_INPUT["statement"],
+    "output_format": "Output\nFor each test case, output \" YES \" if Yousef can reach the exit, and \" NO \" otherwise.",
+}
+
+LEAN_SYSTEM_PROMPT = (
+    "You are given the 'statement' and 'output_format' fields of a competitive programming problem. "
+    "Do not solve the problem. Remove every mention that the answer may be printed in any case "
+    "(e.g. 'yEs', 'yes', 'Yes'), so only a single output format remains, and leave all other text unchanged. "
+    "Return a JSON object with exactly the keys 'statement' and 'output_format'.\n\n"
+    f"Example input:\n{json.dumps(LEAN_EXAMPLE_INPUT)}\n\nExample output:\n{json.dumps(LEAN_EXAMPLE_OUTPUT)}"
+)
+
+def build_lean_request(problem_data: dict) -> dict:
+    """Like build_request, but sends only the editable fields and a one-shot prompt."""
+    fields = {field: problem_data.get(field, "") for field in EDITABLE_FIELDS}
+    return {
+        "model": MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": LEAN_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": f"Return in json mode\n{json.dumps(fields)}"
+            },
+        ],
+        **SAMPLING,
+        "stream": False,
+        "response_format": {"type": "json_object"},
+        "stop": None,
+    }
+
+def parse_lean_completion(completion, problem_data: dict) -> dict:
+    """Patches the returned fields into a copy of `problem_data` and validates the result."""
+    fields = json.loads(completion.choices[0].message.content)
+    if not all(isinstance(fields.get(field), str) for field in EDITABLE_FIELDS):
+        print(f"Skipping invalid response for problem: {problem_data['name']}")
+        return None
+    result = dict(problem_data)
+    result.update((field, fields[field]) for field in EDITABLE_FIELDS)
+    if validate_json(result):
+        return result
+    print(f"Skipping invalid response for problem: {problem_data['name']}")
+    return None
+
+# mode -> (request builder, completion parser)
+REQUEST_MODES = {
+    "full": (build_request, parse_completion),
+    "lean": (build_lean_request, parse_lean_completion),
+}
+
+# Lean results are cached as the rewritten fields only, since the request (and so the key)
+# covers nothing else; the version keeps whole records cached by earlier runs from matching
+LEAN_CACHE_VERSION = 2
+
+def cache_key(problem_data: dict, mode: str = "lean") -> str:
+    request = REQUEST_MODES[mode][0](problem_data)
+    if mode == "lean":
+        request = {"cache_version": LEAN_CACHE_VERSION, **request}
+    return request_key(request)
+
+def cache_entry(result: dict, mode: str = "lean") -> dict:
+    return {field: result[field] for field in EDITABLE_FIELDS} if mode == "lean" else result
+
+def from_cache_entry(entry: dict, problem_data: dict, mode: str = "lean") -> dict:
+    """Patches cached lean fields into this problem, so mirrored statements don't swap records."""
+    if mode != "lean":
+        return entry
+    result = dict(problem_data)
+    result.update((field, entry[field]) for field in EDITABLE_FIELDS)
+    return result
+
+usage_totals = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+def log_usage(completion, problem_data: dict) -> None:
+    """Prints the prompt/completion token counts of one call and adds them to usage_totals."""
+    usage = getattr(completion, "usage", None)
+    if not usage:
+        return
+    usage_totals["requests"] += 1
+    usage_totals["prompt_tokens"] += usage.prompt_tokens
+    usage_totals["completion_tokens"] += usage.completion_tokens
+    print(f"{problem_data['name']}: {usage.prompt_tokens} prompt + {usage.completion_tokens} completion tokens")
+
+def get_new_problem_data(problem_data: dict, mode: str = "lean") -> dict:
+    """Process problem data via Groq API to normalize case-insensitive responses."""
+    build, parse = REQUEST_MODES[mode]
+    try:
+        completion = client.chat.completions.create(**build(problem_data))
+        log_usage(completion, problem_data)
+        return parse(completion, problem_data)
+    except Exception as e:
+        print(f"Error processing problem {problem_data['name']}: {e}")
+        return None
+
+def estimate_tokens(request: dict) -> int:
+    """Rough prompt size (about 4 characters per token) plus the completion cap."""
+    prompt_chars = sum(len(message["content"]) for message in request["messages"])
+    return prompt_chars // 4 + request["max_completion_tokens"]
+
+async def get_new_problem_data_async(async_client, problem_data: dict, budget: RequestBudget,
+                                     max_retries: int = 5, mode: str = "lean") -> dict:
+    """Async get_new_problem_data: waits for the RPM/TPM budget and retries 429/5xx."""
+    build, parse = REQUEST_MODES[mode]
+    request = build(problem_data)
+    estimate = estimate_tokens(request)
+
+    async def call():
+        reservation = await budget.acquire(estimate)
+        completion = await async_client.chat.completions.create(**request)
+        if getattr(completion, "usage", None):
+            budget.settle(reservation, completion.usage.total_tokens)
+        return completion
+
+    try:
+        completion = await with_retries(call, max_retries=max_retries)
+        log_usage(completion, problem_data)
+        return parse(completion, problem_data)
     except Exception as e:
         print(f"Error processing problem {problem_data['name']}: {e}")
         return None
 
-def process_problems(file_dir: str, temp_set_dir: str = None) -> None:
+def normalize_problems(problems: List[dict], concurrency: int, rpm: int, tpm: int,
+                       on_result: Callable[[dict, dict], None] = None, mode: str = "lean") -> List[dict]:
+    """Runs get_new_problem_data_async over `problems` on a worker pool, results in input order.
+
+    `on_result(problem_data, result)` is called as soon as each call finishes.
+    """
+    async def run():
+        # Retries are handled by with_retries, so the SDK's own retry loop is turned off
+        async_client = AsyncGroq(max_retries=0)
+        budget = RequestBudget(rpm, tpm)
+
+        async def worker(problem_data):
+            result = await get_new_problem_data_async(async_client, problem_data, budget, mode=mode)
+            if on_result:
+                on_result(problem_data, result)
+            return result
+
+        results = await run_pool(problems, worker, concurrency)
+        return [results[i] for i in range(len(problems))]
+    return asyncio.run(run())
+
+def needs_normalization(problem_data: dict) -> bool:
+    return 'yEs' in problem_data.get('statement', '') or \
+           'yEs' in problem_data.get('output_format', '')
+
+def process_problems(file_dir: str, cache_path: str = DEFAULT_CACHE_PATH, concurrency: int = 8,
+                     rpm: int = 30, tpm: int = 30000, sequential: bool = False, mode: str = "lean",
+                     use_rules: bool = True) -> None:
     """Main function to process problems, normalize data, and save results to two files."""
+    usage_totals.update(requests=0, prompt_tokens=0, completion_tokens=0)
     data = load_data(file_dir)
-    temp_set = load_data(temp_set_dir) if temp_set_dir else defaultdict(dict)
+    cache = LLMCache(cache_path)
+
+    # Known boilerplate is rewritten locally, then the cache answers what it can;
+    # only the rest goes to the LLM, concurrently
+    processed, pending = {}, []
+    rule_changes = Counter()
+    cached_count = 0
+    for contest in data:
+        for problem in data[contest]:
+            problem_data = data[contest][problem]
+            if needs_normalization(problem_data):
+                rewritten = rewrite_problem(problem_data) if use_rules else None
+                if rewritten:
+                    processed[(contest, problem)], changes = rewritten
+                    rule_changes.update(changes)
+                    continue
+                cached = cache.get(cache_key(problem_data, mode))
+                if cached is not None:
+                    processed[(contest, problem)] = from_cache_entry(cached, problem_data, mode)
+                    cached_count += 1
+                else:
+                    pending.append((contest, problem))
+    local_count = len(processed) - cached_count
+
+    def store(problem_data: dict, result: dict) -> None:
+        # Written as soon as it validates, so a crash mid-run keeps everything paid for
+        if result:
+            cache.put(cache_key(problem_data, mode), MODEL, cache_entry(result, mode))
+
+    problems = [data[contest][problem] for contest, problem in pending]
+    if sequential:
+        outputs = []
+        for problem_data in problems:
+            outputs.append(get_new_problem_data(problem_data, mode))
+            store(problem_data, outputs[-1])
+            time.sleep(4)
+    else:
+        outputs = normalize_problems(problems, concurrency, rpm, tpm, on_result=store, mode=mode)
+    processed.update(zip(pending, outputs))
 
     new_data = defaultdict(dict)
     new_problems = defaultdict(dict)
     invalid_count = 0
     edited_count = 0
 
-    # Process each problem
+    # Assemble in file order, exactly as the sequential loop did
     for contest in data:
         for problem in data[contest]:
             problem_data = data[contest][problem]
             # Check if problem needs normalization
-            if 'yEs' in problem_data.get('statement', '') or \
-               'yEs' in problem_data.get('output_format', ''):
-                if contest in temp_set and problem in temp_set[contest]:
-                    new_data[contest][problem] = temp_set[contest][problem]
-                    new_problems[contest][problem] = temp_set[contest][problem]
-                    continue
-
-                processed_data = get_new_problem_data(problem_data)
+            if needs_normalization(problem_data):
+                processed_data = processed[(contest, problem)]
                 if processed_data:
                     new_data[contest][problem] = processed_data
                     new_problems[contest][problem] = processed_data
@@ -128,16 +333,36 @@ def process_problems(file_dir: str, temp_set_dir: str = None) -> None:
                 else:
                     invalid_count += 1
                     new_data[contest][problem] = problem_data
-                time.sleep(4)
             else:
                 new_data[contest][problem] = problem_data
 
-    print(f"Processed {len(data)} contests, {edited_count} problems edited, {invalid_count} problems failed validation.")
+    print(f"Processed {len(data)} contests, {edited_count} problems edited ({local_count} by rules, "
+          f"{cached_count} from cache, {len(pending)} API calls), {invalid_count} problems failed validation.")
+    flagged = local_count + cached_count + len(pending)
+    if flagged:
+        print(f"Rules handled {local_count}/{flagged} flagged problems locally ({local_count / flagged:.1%}).")
+    if rule_changes:
+        print(f"Rule changes: {summarize(rule_changes)}")
+    if usage_totals["requests"]:
+        print(f"Token usage over {usage_totals['requests']} calls: {usage_totals['prompt_tokens']} prompt, "
+              f"{usage_totals['completion_tokens']} completion.")
     save_data(file_dir, new_data, new_problems)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process competitive programming problems.")
     parser.add_argument("--dir", type=str, required=True, help="Location of JSON file containing problem info")
-    parser.add_argument("--temp_set", type=str, required=False)
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE_PATH,
+                        help="SQLite cache of validated results, keyed by a hash of the request")
+    parser.add_argument("--concurrency", type=int, default=8, help="Completions in flight at once")
+    parser.add_argument("--rpm", type=int, default=30, help="Request budget per minute")
+    parser.add_argument("--tpm", type=int, default=30000, help="Token budget per minute")
+    parser.add_argument("--sequential", action="store_true",
+                        help="One completion at a time with a fixed 4s pause, as before")
+    parser.add_argument("--mode", type=str, default="lean", choices=sorted(REQUEST_MODES),
+                        help="lean sends only statement/output_format and patches them back; "
+                             "full sends and returns the whole problem")
+    parser.add_argument("--no-rules", action="store_true",
+                        help="Send every flagged problem to the LLM instead of rewriting known boilerplate locally")
     args = parser.parse_args()
-    process_problems(args.dir, args.temp_set)
\ No newline at end of file
+    process_problems(args.dir, args.cache, args.concurrency, args.rpm, args.tpm, args.sequential, args.mode,
+                     not args.no_rules)
\ No newline at end of file
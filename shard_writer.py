@@ -0,0 +1,156 @@
+"""Sharded split output with a manifest, used by dataset_split.py --shards.
+
+Every problem goes to shard blake2b(datasource, contest_id, problem_key) % num_shards of
+its split. Assignment therefore depends only on the problem and the shard count, and
+rows keep their input order within a shard.
+
+Writing happens in two phases:
+    1. records are streamed once into per-shard spool files, hashing each shard's content
+    2. shards are converted to CSV/Parquet in a process pool
+A shard whose content hash matches the previous manifest, and whose file is still
+intact, is not rewritten, so regenerating after a small change touches only the
+affected shards.
+
+manifest.json:
+    {"format": "parquet", "num_shards": 8, "policy": "contest",
+     "splits": {"train": [{"file": "train-00000-of-00008.parquet", "rows": 123,
+                           "sha256": "<file checksum>", "content_sha256": "<row hash>"}, ...], ...}}
+"""
+import os
+import json
+import shutil
+import hashlib
+from multiprocessing import Pool
+from typing import Dict, Iterable, Tuple
+
+MANIFEST_NAME = "manifest.json"
+SPOOL_DIR = ".spool"
+
+
+def shard_of(record: dict, num_shards: int) -> int:
+    key = f"{record.get('datasource', '')}\t{record['contest_id']}\t{record['problem_key']}"
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") % num_shards
+
+
+def shard_name(split: str, shard: int, num_shards: int, file_format: str) -> str:
+    return f"{split}-{shard:05d}-of-{num_shards:05d}.{file_format}"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(out_dir: str) -> dict:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_shard(task: Tuple[str, str, str]) -> Tuple[int, str]:
+    """Converts one spool file into the final format; runs in the worker processes.
+
+    Returns:
+        Tuple[int, str]: Rows written and the sha256 of the output file.
+    """
+    from dataset_split import SPLIT_WRITERS  # imported here: dataset_split imports this module
+
+    spool_path, out_path, file_format = task
+    writer = SPLIT_WRITERS[file_format](out_path)
+    rows = 0
+    try:
+        with open(spool_path, "r", encoding="utf-8") as f:
+            for line in f:
+                contest_id, problem_key, problem_data = json.loads(line)
+                writer.write(contest_id, problem_key, problem_data)
+                rows += 1
+    finally:
+        writer.close()
+    return rows, file_sha256(out_path)
+
+
+def write_shards(rows: Iterable[Tuple[str, dict, str, str, dict]], out_dir: str, num_shards: int,
+                 file_format: str = "parquet", workers: int = 4, policy: str = "") -> dict:
+    """Writes (split, record, contest_id, problem_key, problem_data) rows into shards.
+
+    Returns:
+        dict: The new manifest, also saved as out_dir/manifest.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    spool_dir = os.path.join(out_dir, SPOOL_DIR)
+    os.makedirs(spool_dir, exist_ok=True)
+
+    # Phase 1: spool every row to its shard, hashing shard contents on the way
+    spools: Dict[Tuple[str, int], tuple] = {}
+    try:
+        for split, record, contest_id, problem_key, problem_data in rows:
+            key = (split, shard_of(record, num_shards))
+            if key not in spools:
+                path = os.path.join(spool_dir, f"{key[0]}-{key[1]:05d}.jsonl")
+                spools[key] = (open(path, "w", encoding="utf-8"), hashlib.sha256(), path)
+            line = json.dumps([contest_id, problem_key, problem_data], ensure_ascii=False) + "\n"
+            spools[key][0].write(line)
+            spools[key][1].update(line.encode("utf-8"))
+    finally:
+        for f, _, _ in spools.values():
+            f.close()
+
+    # Every split seen gets all of its shards, empty ones included, so names stay predictable
+    splits = sorted({split for split, _ in spools})
+    previous = load_manifest(out_dir)
+    reusable = {}
+    if previous.get("format") == file_format and previous.get("num_shards") == num_shards:
+        for entries in previous.get("splits", {}).values():
+            reusable.update((entry["file"], entry) for entry in entries)
+
+    manifest = {"format": file_format, "num_shards": num_shards, "policy": policy,
+                "splits": {split: [None] * num_shards for split in splits}}
+    tasks, positions = [], []
+    for split in splits:
+        for shard in range(num_shards):
+            name = shard_name(split, shard, num_shards, file_format)
+            out_path = os.path.join(out_dir, name)
+            spool = spools.get((split, shard))
+            if spool is None:
+                spool_path = os.path.join(spool_dir, f"{split}-{shard:05d}.jsonl")
+                open(spool_path, "w").close()
+                content = hashlib.sha256().hexdigest()
+            else:
+                spool_path, content = spool[2], spool[1].hexdigest()
+
+            old = reusable.get(name)
+            if old and old["content_sha256"] == content and os.path.isfile(out_path) \
+                    and file_sha256(out_path) == old["sha256"]:
+                manifest["splits"][split][shard] = old
+                continue
+            tasks.append((spool_path, out_path, file_format))
+            positions.append((split, shard, name, content))
+
+    # Phase 2: convert the changed shards in parallel
+    if workers > 1 and len(tasks) > 1:
+        with Pool(min(workers, len(tasks))) as pool:
+            results = pool.map(write_shard, tasks)
+    else:
+        results = [write_shard(task) for task in tasks]
+    for (split, shard, name, content), (count, checksum) in zip(positions, results):
+        manifest["splits"][split][shard] = {"file": name, "rows": count, "sha256": checksum,
+                                            "content_sha256": content}
+
+    # Shards from an earlier layout (other shard count, format or split) are stale
+    current = {entry["file"] for entries in manifest["splits"].values() for entry in entries}
+    for entries in previous.get("splits", {}).values():
+        for entry in entries:
+            if entry["file"] not in current and os.path.isfile(os.path.join(out_dir, entry["file"])):
+                os.remove(os.path.join(out_dir, entry["file"]))
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(spool_dir)
+    print(f"Wrote {len(tasks)} shards, kept {len(current) - len(tasks)} unchanged, manifest in "
+          f"{os.path.join(out_dir, MANIFEST_NAME)}")
+    return manifest
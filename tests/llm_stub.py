@@ -0,0 +1,84 @@
+"""Local stand-in for the Groq chat-completions endpoint, for exercising llm_pool."""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable
+
+
+class StubServer:
+    """Answers every POST with a completion that echoes the last message.
+
+    Args:
+        failures (Iterable[int]): Status codes returned, in order, before any request succeeds.
+        delay (float): Seconds each request takes.
+        total_tokens (int): Usage reported per completion.
+    """
+    def __init__(self, failures: Iterable[int] = (), delay: float = 0.0, total_tokens: int = 150):
+        self.failures = list(failures)
+        self.delay = delay
+        self.total_tokens = total_tokens
+        self.arrivals = []  # time.monotonic() of every request, in arrival order
+        self.statuses = []
+        self.inflight = 0
+        self.max_inflight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "StubServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status: int, payload: dict, headers: dict = None) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.arrivals.append(time.monotonic())
+                    status = stub.failures.pop(0) if stub.failures else 200
+                    stub.statuses.append(status)
+                    stub.inflight += 1
+                    stub.max_inflight = max(stub.max_inflight, stub.inflight)
+                try:
+                    time.sleep(stub.delay)
+                finally:
+                    with stub.lock:
+                        stub.inflight -= 1
+
+                if status != 200:
+                    headers = {"Retry-After": "0.1"} if status == 429 else {}
+                    self.reply(status, {"error": {"message": f"stub status {status}"}}, headers)
+                    return
+                self.reply(200, {
+                    "id": "stub", "object": "chat.completion", "created": 0, "model": request["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": request["messages"][-1]["content"]}}],
+                    "usage": {"prompt_tokens": stub.total_tokens - 50, "completion_tokens": 50,
+                              "total_tokens": stub.total_tokens},
+                })
+
+        return Handler
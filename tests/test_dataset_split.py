@@ -0,0 +1,54 @@
+from dataset_split import UNSCORED, NgramIndex, assign_split
+
+STATEMENT = ("Alice has an array of n integers and wants to know the sum of all of them. "
+             "She writes the numbers on a board one by one, adding each new number to a running total, "
+             "and at the end she reports the total to Bob, who checks it against his own calculation. "
+             "Help Alice compute the total quickly, since the array can be very long and Bob is impatient.")
+
+
+def record(contest_id: str, statement: str, examples: list) -> dict:
+    return {"contest_id": contest_id, "problem_key": "A", "datasource": "CF", "name": "Sum",
+            "statement": statement, "examples": examples}
+
+
+def train_index(*records: dict) -> NgramIndex:
+    index = NgramIndex()
+    for train_record in records:
+        index.add(train_record)
+    return index.build()
+
+
+def test_identical_samples_are_detected():
+    index = train_index(record("100", "Find the sum of the numbers.", [{"input": ["3", "1 2 3"], "output": ["6"]}]))
+    # Different wording, same sample I/O up to whitespace
+    test = record("2100", "Output the total of the given values.", [{"input": ["3", "1  2 3 "], "output": ["6"]}])
+    assert index.score(test) == (1.0, "examples")
+
+
+def test_lightly_paraphrased_statement_is_detected():
+    index = train_index(record("100", STATEMENT, []))
+    paraphrased = STATEMENT.replace("Alice", "Carol").replace("impatient", "in a hurry")
+    score, field = index.score(record("2100", paraphrased, [{"input": ["1", "5"], "output": ["5"]}]))
+    assert field == "statement" and score >= 0.5
+
+
+def test_unrelated_problem_scores_low():
+    index = train_index(record("100", STATEMENT, [{"input": ["3", "1 2 3"], "output": ["6"]}]))
+    test = record("2100", "Given a tree with n vertices, find its diameter. " * 3,
+                  [{"input": ["2", "1 2"], "output": ["1"]}])
+    assert index.score(test)[0] < 0.5
+
+
+def test_record_without_text_is_unscored_not_clean():
+    index = train_index(record("100", STATEMENT, []))
+    leaks = []
+    split = assign_split(record("2100", "", []), lambda r: True, index, leaks=leaks)
+    assert split == "test"
+    assert index.score(record("2100", "", [])) == (0.0, UNSCORED)
+    assert [leak["field"] for leak in leaks] == [UNSCORED]
+
+
+def test_trivial_samples_are_not_evidence():
+    index = train_index(record("100", "Print the number.", [{"input": ["1"], "output": ["1"]}]))
+    test = record("2100", "", [{"input": ["1"], "output": ["1"]}])
+    assert index.score(test) == (0.0, UNSCORED)
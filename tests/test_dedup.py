@@ -0,0 +1,49 @@
+import random
+
+from dedup import find_clusters
+
+WORDS = [f"w{i}" for i in range(500)]
+
+
+def statement(seed: int, length: int = 120) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def record(datasource: str, contest_id: str, problem_key: str, text: str) -> dict:
+    return {"datasource": datasource, "contest_id": contest_id, "problem_key": problem_key,
+            "statement": text, "input_format": "The first line contains n."}
+
+
+def edit(text: str, every: int) -> str:
+    """Replaces every `every`-th word, roughly what separates an easy and a hard version."""
+    return " ".join("changed" if i % every == 0 else word for i, word in enumerate(text.split()))
+
+
+def test_duplicate_across_contests_is_dropped():
+    text = statement(1)
+    records = [record("Codeforces", "2094", "A", text), record("Codeforces", "2095", "A", text),
+               record("Codeforces", "2096", "A", statement(2))]
+    assert find_clusters(records) == {0: [(1, 1.0)]}
+
+
+def test_easy_and_hard_versions_of_one_contest_are_kept():
+    easy = statement(3)
+    hard = edit(easy, 40)
+    records = [record("Codeforces", "2094", "E1", easy), record("Codeforces", "2094", "E2", hard)]
+    assert find_clusters(records) == {}
+    # The same pair split across contests would have been merged
+    records[1]["contest_id"] = "2095"
+    assert list(find_clusters(records)) == [0]
+
+
+def test_similarity_does_not_chain():
+    a = statement(4)
+    b = edit(a, 25)
+    # The same edits at other offsets: Jaccard is ~0.69 for a~b, ~0.65 for b~c, ~0.43 for a~c
+    c = " ".join("changed" if i % 25 == 12 else word for i, word in enumerate(b.split()))
+    records = [record("Codeforces", str(contest), "A", text) for contest, text in enumerate((a, b, c))]
+    clusters = find_clusters(records, threshold=0.55)
+    # b is close to a and to c, but c is kept because it is not close to a itself
+    assert [position for position, _ in clusters[0]] == [1]
+    assert 2 not in {position for members in clusters.values() for position, _ in members}
@@ -0,0 +1,120 @@
+import os
+from typing import Dict
+
+import pytest
+from bs4 import BeautifulSoup
+
+import atcoder
+from codeforces import extract_problem_data, parse_page
+
+PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def read_page(site: str, name: str) -> str:
+    with open(os.path.join(PAGES, site, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def baseline_extract_problem_data(soup: BeautifulSoup) -> Dict:
+    """CodeforcesScraper.extract_problem_data as first committed, the byte-identical reference."""
+    problem_data = {
+        "name": "",
+        "statement": "",
+        "input_format": "",
+        "output_format": "",
+        "examples": [],
+        "notes": ""
+    }
+
+    # Problem name
+    title = soup.find("div", class_="title")
+    if title:
+        problem_data["name"] = title.text.strip()
+
+    # Problem statement
+    statement = soup.find("div", class_="problem-statement")
+    if statement:
+        paragraphs = statement.find_all("div", recursive=False)[1]  # Skip header
+        problem_data["statement"] = "\n".join(p.text.strip() for p in paragraphs if p.text.strip())
+
+    # Helper function to extract text from all nested elements
+    def extract_all_text(section) -> str:
+        if not section:
+            return ""
+        texts = []
+        for elem in section.find_all(recursive=True):
+            if elem.name in ["script", "style"]:
+                continue
+            text = elem.get_text(separator=" ", strip=True)
+            if text:
+                texts.append(text)
+        return "\n".join(texts)
+
+    # Input format
+    input_section = soup.find("div", class_="input-specification")
+    problem_data["input_format"] = extract_all_text(input_section)
+
+    # Output format
+    output_section = soup.find("div", class_="output-specification")
+    problem_data["output_format"] = extract_all_text(output_section)
+
+    # Examples
+    sample_tests = soup.find_all("div", class_="sample-test")
+    for sample in sample_tests:
+        input_data = sample.find("div", class_="input")
+        output_data = sample.find("div", class_="output")
+        if input_data and output_data:
+            input_lines = [
+                line.text.strip() for line in input_data.find("pre").find_all("div", class_="test-example-line")
+            ]
+            output_lines = [
+                line.text.strip() for line in output_data.find("pre").find_all("div", class_="test-example-line")
+            ]
+            if not input_lines:
+                input_lines = input_data.find("pre").text.strip().split("\n")
+            if not output_lines:
+                output_lines = output_data.find("pre").text.strip().split("\n")
+            problem_data["examples"].append({"input": input_lines, "output": output_lines})
+
+    # Notes
+    notes = soup.find("div", class_="note")
+    problem_data["notes"] = extract_all_text(notes)
+
+    return problem_data
+
+
+# Fields where the original extraction printed inline text again once per ancestor level
+REPEATED_FIELDS = {"statement_tex_spans.html": ("input_format", "output_format", "notes")}
+
+
+def assert_is_baseline_without_repeats(text: str, baseline: str) -> None:
+    """`text` is the baseline with some lines dropped, and each dropped line only repeated kept text."""
+    kept, lines = text.split("\n"), baseline.split("\n")
+    remaining = iter(lines)
+    assert all(line in remaining for line in kept), (text, baseline)
+    assert len(kept) < len(lines)
+    assert all(line in " ".join(kept) for line in lines), (text, baseline)
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+@pytest.mark.parametrize("name", ["statement_plain.html", "statement_tex_spans.html"])
+def test_codeforces_extraction_matches_across_parsers(name, parser):
+    html = read_page("codeforces", name)
+    problem = extract_problem_data(parse_page(html, parser=parser))
+    baseline = baseline_extract_problem_data(BeautifulSoup(html, "html.parser"))
+    repeated = REPEATED_FIELDS.get(name, ())
+    # Byte-identical wherever the original extraction was correct
+    assert {k: v for k, v in problem.items() if k not in repeated} == \
+        {k: v for k, v in baseline.items() if k not in repeated}
+    for field in repeated:
+        assert_is_baseline_without_repeats(problem[field], baseline[field])
+    assert problem["name"] == "A. False Alarm"
+    assert problem["input_format"].startswith("Input\nThe first line contains")
+    assert problem["examples"] == [{"input": ["2", "4 2", "0 1 1 0"], "output": ["YES", "NO"]}]
+    assert problem["notes"].startswith("Note\n")
+
+
+def test_atcoder_extraction_keeps_every_sample():
+    problem = atcoder.parse_problem(BeautifulSoup(read_page("atcoder", "task_many_samples.html"), "html.parser"))
+    assert problem["name"] == "G - Many"
+    assert [example["output"] for example in problem["examples"]] == [str(2 * n) for n in range(1, 13)]
@@ -0,0 +1,52 @@
+import itertools
+
+from filter_rules import FILTER_RULES, RuleSet
+
+
+def legacy_is_valid_problem(problem_data: dict) -> bool:
+    """filter_problems.is_valid_problem before the rule set replaced it."""
+    statement = problem_data["statement"]
+    output_format = problem_data["output_format"]
+
+    is_interactive = "interactive" in statement or "interactive" in output_format
+    has_multi_sol = "print any of" in statement or "print any of" in output_format or \
+                    "output any" in statement or "output any" in output_format
+    return False if is_interactive or has_multi_sol else True
+
+
+FRAGMENTS = [
+    "",
+    "Find the shortest path.",
+    "This is an interactive problem.",
+    "This is an Interactive problem.",
+    "The problem is non-interactive.",
+    "If there are several answers, print any of them.",
+    "If there are several answers, Print any of them.",
+    "You may output any valid permutation.",
+    "Output anything you like.",
+    "Output any.",
+    "print any",
+    "It is case-insensitive, so yEs also works.",
+    "Any valid solution is accepted.",
+]
+
+
+def test_rule_set_drops_exactly_what_is_valid_problem_dropped():
+    rules = RuleSet(FILTER_RULES)
+    for statement, output_format in itertools.product(FRAGMENTS, repeat=2):
+        problem = {"statement": statement, "output_format": output_format}
+        assert (rules.dropped_by(problem) is None) == legacy_is_valid_problem(problem), problem
+
+
+def test_include_and_exclude_matching_at_the_same_offset():
+    rules = RuleSet([
+        {"name": "interactive", "action": "exclude", "fields": ["statement"], "keywords": ["interactive"]},
+        {"name": "interactive_hacks", "action": "include", "fields": ["statement"],
+         "regexes": [r"interactive hacks? format"]},
+    ])
+    problem = {"statement": "See the interactive hacks format below."}
+    assert rules.matches(problem) == {"interactive": ("statement", "interactive"),
+                                      "interactive_hacks": ("statement", "interactive hacks format")}
+    assert rules.dropped_by(problem) is None
+    assert rules.dropped_by({"statement": "This is an interactive problem."}) == (
+        "interactive", "statement", "interactive")
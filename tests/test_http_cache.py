@@ -0,0 +1,109 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_cache import CachedResponse, ResponseCache
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class PageServer:
+    """Serves /<name> as "page <name> v<version>" with an ETag and Last-Modified, and
+    answers matching conditional requests with 304."""
+    def __init__(self):
+        self.version = 1
+        self.requests = []  # (path, If-None-Match, If-Modified-Since)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                etag = f'"v{server.version}"'
+                server.requests.append((self.path, self.headers.get("If-None-Match"),
+                                        self.headers.get("If-Modified-Since")))
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = f"page {self.path[1:]} v{server.version}".encode("utf-8") * 10
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{name}"
+
+
+@pytest.fixture
+def pages():
+    server = PageServer()
+    server.thread.start()
+    yield server
+    server.stop()
+
+
+def test_fresh_entry_is_served_from_disk_until_the_ttl_expires(tmp_path, pages):
+    cache = ResponseCache(str(tmp_path))
+    first = cache.get(requests, pages.url("a"), ttl=0.2)
+    assert not isinstance(first, CachedResponse) and first.text.startswith("page a v1")
+
+    second = cache.get(requests, pages.url("a"), ttl=0.2)
+    assert isinstance(second, CachedResponse) and second.text == first.text
+    assert len(pages.requests) == 1
+
+    time.sleep(0.25)
+    pages.version = 2
+    third = cache.get(requests, pages.url("a"), ttl=0.2)
+    assert third.text.startswith("page a v2") and len(pages.requests) == 2
+    # A reopened cache sees the new body
+    assert ResponseCache(str(tmp_path)).get(requests, pages.url("a"), ttl=60).text == third.text
+
+
+def test_stale_entry_is_revalidated_and_a_304_refreshes_it(tmp_path, pages):
+    cache = ResponseCache(str(tmp_path))
+    cache.get(requests, pages.url("a"), ttl=0.1)
+    time.sleep(0.15)
+
+    revalidated = cache.get(requests, pages.url("a"), ttl=60)
+    assert pages.requests[-1] == ("/a", '"v1"', LAST_MODIFIED)
+    assert isinstance(revalidated, CachedResponse) and revalidated.text.startswith("page a v1")
+
+    # The 304 renewed the TTL, so the next read does not touch the network
+    cache.get(requests, pages.url("a"), ttl=60)
+    assert len(pages.requests) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, pages):
+    cache = ResponseCache(str(tmp_path))
+    cache.get(requests, pages.url("a"))
+    blob_size = cache.db.execute("SELECT size FROM entries").fetchone()[0]
+    cache.max_bytes = 2 * blob_size
+
+    cache.get(requests, pages.url("b"))
+    time.sleep(0.01)
+    cache.get(requests, pages.url("a"))  # a is now more recent than b
+    time.sleep(0.01)
+    cache.get(requests, pages.url("c"))  # over the limit: b goes
+
+    cached = {url for url, in cache.db.execute("SELECT url FROM entries")}
+    assert cached == {pages.url("a"), pages.url("c")}
+    assert len(list((tmp_path / "blobs").rglob("*.z"))) == 2
+
+    cache.get(requests, pages.url("b"))
+    assert pages.requests[-1][0] == "/b" and len(pages.requests) == 4
@@ -0,0 +1,45 @@
+import json
+
+from journal import ProblemJournal, read_journal
+
+
+def test_torn_tail_is_cut_off_on_reopen(tmp_path):
+    path = str(tmp_path / "problems.jsonl")
+    journal = ProblemJournal(path)
+    journal.append("100", "A", {"name": "A"})
+    journal.append("100", "B", {"name": "B"})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"contest": "100", "index": "C", "da')  # the process died mid-write
+
+    # Readers skip the torn line; reopening for writing removes it
+    assert set(read_journal(path)) == {("100", "A"), ("100", "B")}
+    journal = ProblemJournal(path)
+    with open(path, "r", encoding="utf-8") as f:
+        assert f.read().endswith('"B"}}\n')
+
+    journal.append("100", "C", {"name": "C"})
+    assert journal.done() == {("100", "A"), ("100", "B"), ("100", "C")}
+
+
+def test_file_with_only_a_torn_line_is_emptied(tmp_path):
+    path = tmp_path / "problems.jsonl"
+    path.write_text('{"contest": "1"' * 2000, encoding="utf-8")  # longer than one 4096-byte chunk
+    ProblemJournal(str(path))
+    assert path.read_text(encoding="utf-8") == ""
+
+
+def test_compact_keeps_the_latest_record_per_key(tmp_path):
+    journal = ProblemJournal(str(tmp_path / "problems.jsonl"))
+    journal.append("101", "A", {"name": "101A"})
+    journal.append("100", "B", {"name": "old B"})
+    journal.append("100", "A", {"name": "100A"})
+    journal.append("100", "B", {"name": "new B"})
+
+    output = str(tmp_path / "problems.json")
+    nested = journal.compact(output, contests=["100", "101", "102"], order=[("100", "A"), ("100", "B")])
+    with open(output, "r", encoding="utf-8") as f:
+        assert json.load(f) == nested
+    assert nested == {"100": {"A": {"name": "100A"}, "B": {"name": "new B"}},
+                      "101": {"A": {"name": "101A"}},
+                      "102": {}}
+    assert list(nested) == ["100", "101", "102"] and list(nested["100"]) == ["A", "B"]
@@ -0,0 +1,24 @@
+import gc
+import json
+import os
+import sys
+
+# The dashboard runs from viz/ and imports lazy_source as a top-level module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "viz"))
+
+from lazy_source import open_source  # noqa: E402
+
+
+def test_jsonl_pages_and_handle_released_with_the_source(tmp_path):
+    path = tmp_path / "problems.jsonl"
+    path.write_text("".join(json.dumps({"name": f"P{i}", "statement": "s"}) + "\n\n" for i in range(5)),
+                    encoding="utf-8")
+    source = open_source(str(path))
+    assert len(source) == 5 and source.columns == ["name", "statement"]
+    assert source.read(1, 3, ["name"]) == [{"name": "P1"}, {"name": "P2"}]
+
+    # What st.cache_resource does on eviction: drop the last reference
+    handle = source.file
+    del source
+    gc.collect()
+    assert handle.closed
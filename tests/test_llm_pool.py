@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import pytest
+from groq import APIStatusError, AsyncGroq
+
+from llm_pool import RequestBudget, run_pool, with_retries
+from llm_stub import StubServer
+
+WINDOW = 0.5
+
+
+@pytest.fixture
+def stub(request):
+    server = StubServer(**getattr(request, "param", {})).start()
+    yield server
+    server.stop()
+
+
+def client(stub: StubServer) -> AsyncGroq:
+    # Retries belong to with_retries, as in normalize_problems
+    return AsyncGroq(api_key="test", base_url=stub.base_url, max_retries=0)
+
+
+def chat(async_client: AsyncGroq, text: str):
+    return async_client.chat.completions.create(model="stub", messages=[{"role": "user", "content": text}])
+
+
+def busiest_window(arrivals, window: float) -> int:
+    """Most requests that arrived within any `window` seconds."""
+    return max(sum(1 for other in arrivals if start <= other < start + window) for start in arrivals)
+
+
+@pytest.mark.parametrize("stub", [{"failures": [429, 503]}], indirect=True)
+def test_retries_429_and_5xx_then_succeeds(stub):
+    async def run():
+        async_client = client(stub)
+        return await with_retries(lambda: chat(async_client, "hello"), base_delay=0.05)
+
+    completion = asyncio.run(run())
+    assert completion.choices[0].message.content == "hello"
+    assert stub.statuses == [429, 503, 200]
+    # The 429 carries Retry-After: 0.1, which takes precedence over the backoff
+    assert stub.arrivals[1] - stub.arrivals[0] >= 0.1
+
+
+@pytest.mark.parametrize("stub", [{"failures": [400]}], indirect=True)
+def test_client_errors_are_not_retried(stub):
+    async def run():
+        async_client = client(stub)
+        return await with_retries(lambda: chat(async_client, "hello"), base_delay=0.05)
+
+    with pytest.raises(APIStatusError):
+        asyncio.run(run())
+    assert stub.statuses == [400]
+
+
+@pytest.mark.parametrize("stub", [{"failures": [503] * 3}], indirect=True)
+def test_gives_up_after_max_retries(stub):
+    async def run():
+        async_client = client(stub)
+        return await with_retries(lambda: chat(async_client, "hello"), max_retries=2, base_delay=0.01)
+
+    with pytest.raises(APIStatusError):
+        asyncio.run(run())
+    assert stub.statuses == [503, 503, 503]
+
+
+def test_budget_respects_requests_per_minute(stub):
+    async def run():
+        async_client = client(stub)
+        budget = RequestBudget(requests_per_minute=3, tokens_per_minute=10 ** 6, window=WINDOW)
+
+        async def worker(i):
+            await budget.acquire(10)
+            return await chat(async_client, str(i))
+
+        return await run_pool(range(7), worker, concurrency=7)
+
+    results = asyncio.run(run())
+    assert len(stub.arrivals) == 7 and len(results) == 7
+    assert busiest_window(stub.arrivals, WINDOW * 0.95) <= 3
+
+
+def test_budget_respects_tokens_per_minute(stub):
+    async def run():
+        async_client = client(stub)
+        budget = RequestBudget(requests_per_minute=100, tokens_per_minute=300, window=WINDOW)
+
+        async def worker(i):
+            reservation = await budget.acquire(150)
+            completion = await chat(async_client, str(i))
+            budget.settle(reservation, completion.usage.total_tokens)
+            return completion
+
+        return await run_pool(range(5), worker, concurrency=5)
+
+    asyncio.run(run())
+    # 150 tokens per request and 300 per window: never more than two at once
+    assert len(stub.arrivals) == 5
+    assert busiest_window(stub.arrivals, WINDOW * 0.95) <= 2
+
+
+@pytest.mark.parametrize("stub", [{"delay": 0.05}], indirect=True)
+def test_run_pool_keeps_positions_and_bounds_concurrency(stub):
+    async def run():
+        async_client = client(stub)
+
+        async def worker(i):
+            # Later items finish first, so completion order differs from input order
+            await asyncio.sleep(0.01 * (6 - i))
+            return (await chat(async_client, f"item {i}")).choices[0].message.content
+
+        return await run_pool(range(6), worker, concurrency=2)
+
+    results = asyncio.run(run())
+    assert [results[i] for i in range(6)] == [f"item {i}" for i in range(6)]
+    assert stub.max_inflight <= 2
+
+
+def test_run_pool_cancellation_stops_workers():
+    started, cancelled = [], []
+
+    async def worker(i):
+        started.append(i)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+
+    async def run():
+        task = asyncio.create_task(run_pool(range(10), worker, concurrency=3))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    begin = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - begin < 1
+    # Only the three in-flight items ever started, and all of them were cancelled
+    assert sorted(started) == [0, 1, 2] and sorted(cancelled) == [0, 1, 2]
@@ -0,0 +1,67 @@
+import os
+import json
+
+from journal import ProblemJournal
+from merge_problems import merge_many
+from records import read_records, write_records
+
+
+def problem(name: str) -> dict:
+    return {"name": name, "statement": f"{name} statement", "input_format": "", "output_format": "",
+            "examples": [], "notes": ""}
+
+
+def test_merge_accepts_scraper_journal(tmp_path):
+    journal = ProblemJournal(str(tmp_path / "abc_problems.jsonl"))
+    journal.append("101", "B ", problem("B old"))
+    journal.append("100", "A ", problem("A"))
+    journal.append("101", "B ", problem("B new"))  # re-scraped later, so it wins
+
+    cf_path = str(tmp_path / "cf.jsonl")
+    write_records(cf_path, [{"contest_id": "100", "problem_key": "A", "datasource": "CF", **problem("CF A")}])
+
+    output = str(tmp_path / "merged.jsonl")
+    merge_many([("AtC", journal.path), ("", cf_path)], output)
+
+    merged = list(read_records(output))
+    assert [(r["datasource"], r["contest_id"], r["problem_key"], r["name"]) for r in merged] == [
+        ("AtC", "100", "A ", "A"),
+        ("AtC", "101", "B ", "B new"),
+        ("CF", "100", "A", "CF A"),
+    ]
+    assert "data" not in merged[0] and merged[0]["statement"] == "A statement"
+
+    with open(output + ".index.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["contests"].keys() == {"AtC\t100", "AtC\t101", "CF\t100"}
+
+
+def test_sorted_source_is_read_once(tmp_path, monkeypatch):
+    import merge_problems
+
+    sorted_path, journal = str(tmp_path / "cf.jsonl"), ProblemJournal(str(tmp_path / "abc_problems.jsonl"))
+    write_records(sorted_path, [{"contest_id": c, "problem_key": "A", "datasource": "CF", **problem(c)}
+                                for c in ("1", "2", "10")])
+    journal.append("2", "A", problem("2"))
+    journal.append("1", "A", problem("1"))
+
+    reads = []
+    monkeypatch.setattr(merge_problems, "read_records", lambda path: reads.append(path) or read_records(path))
+    merge_many([("", sorted_path), ("AtC", journal.path)], str(tmp_path / "merged.jsonl"))
+    # The journal is recognized up front and sorted in memory, so neither source is read twice
+    assert sorted(reads) == sorted([sorted_path, journal.path])
+
+
+def test_skip_unchanged_keeps_the_output(tmp_path):
+    source, output = str(tmp_path / "cf.jsonl"), str(tmp_path / "merged.jsonl")
+    write_records(source, [{"contest_id": "1", "problem_key": "A", "datasource": "CF", **problem("A")}])
+    merge_many([("", source)], output)
+    before = os.stat(output).st_mtime_ns
+
+    merge_many([("", source)], output, skip_unchanged=True)
+    assert os.stat(output).st_mtime_ns == before
+
+    write_records(source, [{"contest_id": "1", "problem_key": "A", "datasource": "CF", **problem("A2")}])
+    merge_many([("", source)], output, skip_unchanged=True)
+    with open(output + ".index.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["changed"] == ["CF\t1"]
+    assert [r["name"] for r in read_records(output)] == ["A2"]
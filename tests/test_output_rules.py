@@ -0,0 +1,53 @@
+from output_rules import rewrite_problem, rewrite_text
+
+
+def test_any_case():
+    text = 'Print "YES" if it is possible.\nYou can output the answer in any case (upper or lower).'
+    assert rewrite_text(text) == ('Print "YES" if it is possible.', ["any_case"], [])
+
+
+def test_letter_any_case():
+    text = 'Output "Yes" or "No". Each letter can be printed in any case.'
+    assert rewrite_text(text) == ('Output "Yes" or "No".', ["letter_any_case"], [])
+
+
+def test_recognized_example():
+    text = ('You can output the answer in any case (upper or lower). For example, the strings '
+            '" yEs ", " yes ", " Yes ", and " YES " will be recognized as positive responses.')
+    assert rewrite_text(text) == ("", ["any_case", "recognized_example"], [])
+
+
+def test_recognized_parenthesized():
+    text = 'Print YES or NO (for example, yEs and Yes are accepted as YES).'
+    assert rewrite_text(text) == ("Print YES or NO", ["recognized_parenthesized"], [])
+
+
+def test_echo_lines_around_the_sentence():
+    text = "Print the answer.\nyEs\nYes\nYou may print the answer in any case.\nYES\nNo"
+    rewritten, changes, unsure = rewrite_text(text)
+    assert rewritten == "Print the answer."
+    assert sorted(changes) == ["any_case"] + ["echo_line"] * 4 and unsure == []
+
+
+def test_example_sentence_in_a_statement_is_kept():
+    problem = {
+        "statement": "For example, the strings ab and ba are considered equal after one swap. "
+                     "Count the pairs of equal strings.",
+        "output_format": 'Print "YES" or "NO". You can output the answer in any case.',
+    }
+    assert rewrite_text(problem["statement"], strict=True) == (problem["statement"], [], [])
+    result, changes = rewrite_problem(problem)
+    assert result["statement"] == problem["statement"] and changes == ["output_format:any_case"]
+
+
+def test_statement_boilerplate_without_the_answers_is_left_to_the_llm():
+    problem = {"statement": "You can print the answer in any case you like.", "output_format": ""}
+    assert rewrite_text(problem["statement"], strict=True)[2] == ["any_case"]
+    assert rewrite_problem(problem) is None
+
+
+def test_rewrite_problem_reports_field_and_rule():
+    problem = {"statement": "Find x.", "output_format": 'Print "YES" or "NO". You can output the answer in any case.'}
+    result, changes = rewrite_problem(problem)
+    assert result == {"statement": "Find x.", "output_format": 'Print "YES" or "NO".'}
+    assert changes == ["output_format:any_case"]
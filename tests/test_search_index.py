@@ -0,0 +1,34 @@
+from search_index import build_index, datasources, search
+
+
+def problem(datasource: str, contest_id: str, problem_key: str, name: str, statement: str) -> dict:
+    return {"datasource": datasource, "contest_id": contest_id, "problem_key": problem_key, "name": name,
+            "statement": statement, "input_format": "", "output_format": "Print the answer.",
+            "examples": [{"input": ["3"], "output": ["6"]}], "notes": ""}
+
+
+RECORDS = [
+    problem("CF", "1", "A", "Sum", "Add the numbers of the tree."),
+    problem("CF", "2", "B", "Tree Paths", "Count the paths of a tree."),
+    problem("AtC", "abc100", "C", "Grid", "Walk on a grid; no tree here."),
+    problem("AtC", "abc101", "D", "Tree", "Tree tree tree: root the tree."),
+]
+
+
+def test_ranked_query(tmp_path):
+    db_path = str(tmp_path / "search.sqlite")
+    assert build_index(RECORDS, db_path) == 4
+    assert datasources(db_path) == ["AtC", "CF"]
+
+    total, results = search(db_path, "tree")
+    assert total == 4
+    # A name hit weighs more than a statement hit, and more occurrences rank higher
+    assert [result["name"] for result in results[:2]] == ["Tree", "Tree Paths"]
+    assert results == sorted(results, key=lambda result: result["score"])
+    assert "[tree]" in results[0]["snippet"].lower()
+
+    total, results = search(db_path, "tree", datasource="CF", limit=1)
+    assert total == 2 and [result["name"] for result in results] == ["Tree Paths"]
+
+    total, results = search(db_path, 'name:tree NOT statement:grid')
+    assert total == 2 and {result["problem_key"] for result in results} == {"B", "D"}
@@ -1,23 +1,58 @@
+"""Dataset explorer. Run it from the repository root with
+
+    python -m streamlit run viz/dashboard.py
+
+`python -m` puts the root on sys.path, so the shared modules (filter_rules,
+search_index) import like they do for the other scripts.
+"""
 import streamlit as st
 import pandas as pd
 import json
-from typing import Dict, List, Tuple
+import os
+import re
+import sqlite3
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# The keyword list comes from the filter's rule set, so the two can't drift apart
+from filter_rules import keywords
+from search_index import datasources, index_for, search
+from lazy_source import open_source
 
 # Configuration
-KEYWORDS = ["interactive", "case-insensitive", "yEs", "valid solution", "print any of", "output any"]
+KEYWORDS = keywords()
+SEARCH_FIELDS = ["name", "statement", "input_format", "output_format", "examples"]
+# One pass per row finds every keyword; the lookahead lets matches overlap
+KEYWORD_PATTERN = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in KEYWORDS) + "))")
 
 # Component: File Upload
-def file_uploader_component() -> Dict:
-    """Handles file upload and returns parsed JSON data."""
+def file_uploader_component() -> Tuple[Optional[str], Optional[bytes]]:
+    """Handles file upload and returns the file's sha256 and raw bytes."""
     uploaded_file = st.file_uploader("Upload JSON dataset", type=["json"])
     if uploaded_file:
-        try:
-            data = json.load(uploaded_file)
-            return data
-        except json.JSONDecodeError:
-            st.error("Invalid JSON file. Please upload a valid JSON file.")
-            return {}
-    return {}
+        raw = uploaded_file.getvalue()
+        return hashlib.sha256(raw).hexdigest(), raw
+    return None, None
+
+# Component: Server-side File
+@st.cache_resource(max_entries=4, show_spinner="Indexing file...")
+def load_source(path: str, mtime: float, size: int):
+    """Opens a JSONL/Parquet file lazily, once per path and version (mtime, size)."""
+    return open_source(path)
+
+def server_path_component():
+    """Returns the lazily opened file at a server-side path, with a key identifying its version."""
+    path = st.text_input("Path to a .jsonl or .parquet file", placeholder="datafiles/cp_datasetv1.jsonl")
+    if not path:
+        return None, None
+    try:
+        stat = os.stat(path)
+        source = load_source(path, stat.st_mtime, stat.st_size)
+    except (OSError, ValueError) as e:
+        st.error(str(e))
+        return None, None
+    version = f"{os.path.abspath(path)}:{stat.st_mtime}:{stat.st_size}"
+    return source, hashlib.sha256(version.encode("utf-8")).hexdigest()
 
 # Component: Data Processing
 def flatten_dataset(data: Dict) -> List[Dict]:
@@ -32,31 +67,50 @@ def flatten_dataset(data: Dict) -> List[Dict]:
             }
             # Flatten examples list into a string
             if "examples" in row:
-                row["examples"] = "; ".join(
-                    [f"Input: {ex['input']}, Output: {ex['output']}" for ex in row["examples"]]
-                )
+                row["examples"] = examples_to_string(row["examples"])
             rows.append(row)
     return rows
 
+def examples_to_string(examples) -> str:
+    if isinstance(examples, str):
+        return examples
+    return "; ".join([f"Input: {ex['input']}, Output: {ex['output']}" for ex in examples or []])
+
 # Component: Keyword Search
 def search_keywords(rows: List[Dict]) -> Tuple[Dict[str, int], Dict[str, List[int]]]:
-    """Searches for keywords in rows and returns counts and matching row indices."""
-    keyword_counts = {keyword: 0 for keyword in KEYWORDS}
+    """Builds the keyword -> matching row indices index and returns counts and matches."""
     keyword_matches = {keyword: [] for keyword in KEYWORDS}
- 
+
     for idx, row in enumerate(rows):
         # Combine text fields for searching
-        text = " ".join(
-            str(row.get(field, ""))
-            for field in ["name", "statement", "input_format", "output_format", "examples"]
-        )
-        for keyword in KEYWORDS:
-            if keyword in text:
-                keyword_counts[keyword] += 1
-                keyword_matches[keyword].append(idx)
-    
+        text = " ".join(str(row.get(field, "")) for field in SEARCH_FIELDS)
+        for keyword in {match.group(1) for match in KEYWORD_PATTERN.finditer(text)}:
+            keyword_matches[keyword].append(idx)
+
+    keyword_counts = {keyword: len(matches) for keyword, matches in keyword_matches.items()}
     return keyword_counts, keyword_matches
 
+# Component: Cached Dataset
+@st.cache_resource(max_entries=4, show_spinner="Indexing dataset...")
+def build_dataset(file_hash: str, _raw: bytes) -> Optional[Dict]:
+    """Parses, flattens and indexes one uploaded file, once per file hash.
+
+    Reruns (every button click) get the same object back, so callers must not mutate it.
+    The leading underscore keeps Streamlit from hashing the raw bytes again.
+    """
+    try:
+        data = json.loads(_raw)
+    except json.JSONDecodeError:
+        return None
+    rows = flatten_dataset(data)
+    keyword_counts, keyword_matches = search_keywords(rows)
+    return {
+        "rows": rows,
+        "df": pd.DataFrame(rows),
+        "keyword_counts": keyword_counts,
+        "keyword_matches": keyword_matches,
+    }
+
 # Component: Sidebar Keyword Analysis
 def keyword_analysis_component(keyword_counts: Dict[str, int], keyword_matches: Dict[str, List[int]], rows: List[Dict]):
     """Displays keyword counts and handles filtering in the sidebar."""
@@ -81,26 +135,80 @@ def keyword_analysis_component(keyword_counts: Dict[str, int], keyword_matches:
     if st.session_state.selected_keyword and st.sidebar.button("Reset Filter"):
         st.session_state.selected_keyword = None
 
+# Component: Full-text Search
+SEARCH_PAGE_SIZE = 20
+
+def search_component(file_hash: str, rows: Iterable[Dict]):
+    """FTS5 search over the loaded dataset with a datasource filter and paging."""
+    st.header("Search")
+    query = st.text_input("Query", placeholder='output_format:"any case" NOT statement:"any case"',
+                          help="SQLite FTS5 syntax: AND/OR/NOT, \"phrases\", prefix*, field:term, NEAR(a b, 5)")
+    if not query:
+        return
+    # Built on the first search and kept on disk per file hash
+    db_path = index_for(rows, file_hash)
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        datasource = st.selectbox("Datasource", ["All"] + datasources(db_path))
+    try:
+        total, _ = search(db_path, query, None if datasource == "All" else datasource, limit=0)
+    except sqlite3.OperationalError as e:
+        st.error(f"Invalid query: {e}")
+        return
+    pages = max(1, -(-total // SEARCH_PAGE_SIZE))
+    with col2:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+    _, results = search(db_path, query, None if datasource == "All" else datasource,
+                        limit=SEARCH_PAGE_SIZE, offset=(page - 1) * SEARCH_PAGE_SIZE)
+    st.write(f"{total} matches")
+    st.dataframe(pd.DataFrame(results), use_container_width=True)
+
 # Component: Data Display
-def display_dataset(rows: List[Dict], keyword_matches: Dict[str, List[int]]):
+def display_dataset(df: pd.DataFrame, keyword_matches: Dict[str, List[int]]):
     """Displays dataset as a scrollable table, filtered by selected keyword if applicable."""
-    if not rows:
+    if df.empty:
         st.info("No data to display. Please upload a JSON file.")
         return
 
     selected_keyword = st.session_state.get("selected_keyword", None)
     if selected_keyword and keyword_matches.get(selected_keyword):
         st.subheader(f"Rows containing '{selected_keyword}'")
-        filtered_indices = keyword_matches[selected_keyword]
-        filtered_rows = [rows[i] for i in filtered_indices]
-        df = pd.DataFrame(filtered_rows)
+        df = df.iloc[keyword_matches[selected_keyword]]
     else:
         st.subheader("Dataset Preview")
-        st.subheader(f"{len(pd.DataFrame(rows))} items")
-        df = pd.DataFrame(rows)
+        st.subheader(f"{len(df)} items")
 
     st.dataframe(df, height=500, use_container_width=True)
 
+# Component: Paged Display
+DEFAULT_COLUMNS = ["contest_id", "problem_key", "problem_id", "datasource", "name"]
+
+def paged_display_component(source):
+    """Shows one page of a lazily opened file, reading only the selected columns."""
+    columns = st.multiselect("Columns", source.columns,
+                             default=[column for column in DEFAULT_COLUMNS if column in source.columns])
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 200], index=1)
+    pages = max(1, -(-len(source) // page_size))
+    # A bigger page size (or a shorter file) leaves fewer pages than the one in session state
+    if st.session_state.get("data_page", 1) > pages:
+        st.session_state["data_page"] = pages
+    with col2:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="data_page")
+
+    start = (page - 1) * page_size
+    rows = source.read(start, min(start + page_size, len(source)), columns)
+    for row in rows:
+        if "examples" in row:
+            row["examples"] = examples_to_string(row["examples"])
+    df = pd.DataFrame(rows, columns=columns or None)
+
+    st.subheader(f"{len(source)} items")
+    st.caption(f"Rows {start + 1}-{start + len(rows)} · page data {df.memory_usage(deep=True).sum() / 1024:.0f} KiB"
+               f" · file index {source.index_bytes() / 1024:.0f} KiB")
+    st.dataframe(df, height=500, use_container_width=True)
+
 # Main App
 def main():
     st.title("Astracode Dataset Dashboard")
@@ -108,14 +216,29 @@ def main():
     # Sidebar for file upload and keyword analysis
     with st.sidebar:
         st.header("Upload Data")
-        data = file_uploader_component()
+        mode = st.radio("Source", ["Upload JSON", "Server path"], horizontal=True)
+        if mode == "Server path":
+            source, source_key = server_path_component()
+        else:
+            file_hash, raw = file_uploader_component()
 
     # Main content
-    if data:
-        rows = flatten_dataset(data)
-        keyword_counts, keyword_matches = search_keywords(rows)
-        keyword_analysis_component(keyword_counts, keyword_matches, rows)
-        display_dataset(rows, keyword_matches)
+    if mode == "Server path":
+        # Opened lazily: no keyword scan, only paged reads and the on-disk search index
+        if source is not None:
+            search_component(source_key, source.iter_records())
+            paged_display_component(source)
+        else:
+            st.write("Enter the path of a JSONL or Parquet file on the server.")
+        return
+
+    dataset = build_dataset(file_hash, raw) if file_hash else None
+    if file_hash and dataset is None:
+        st.error("Invalid JSON file. Please upload a valid JSON file.")
+    elif dataset and dataset["rows"]:
+        keyword_analysis_component(dataset["keyword_counts"], dataset["keyword_matches"], dataset["rows"])
+        search_component(file_hash, dataset["rows"])
+        display_dataset(dataset["df"], dataset["keyword_matches"])
     else:
         st.write("Upload a JSON file to visualize the dataset.")
 
@@ -0,0 +1,108 @@
+"""Lazy, paged access to a dataset file on the server (JSONL records or Parquet).
+
+Nothing but an index is kept in memory: byte offsets of each line for JSONL (8 bytes
+a row), or the row group layout from the Parquet footer. A page reads only its own
+rows and only the requested columns.
+"""
+import os
+import json
+import threading
+from array import array
+from typing import Dict, Iterator, List
+
+import pyarrow.parquet as pq
+
+
+class JsonlSource:
+    def __init__(self, path: str):
+        self.path = path
+        # One handle for every page read; the dashboard shares a source across sessions, hence the lock
+        self.file = open(path, "rb")
+        self.lock = threading.Lock()
+        self.offsets = array("q")
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    self.offsets.append(offset)
+                offset += len(line)
+        self.columns = []
+        if self.offsets:
+            self.columns = list(self.read(0, 1)[0].keys())
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def index_bytes(self) -> int:
+        return self.offsets.itemsize * len(self.offsets)
+
+    def read(self, start: int, stop: int, columns: List[str] = None) -> List[Dict]:
+        rows = []
+        with self.lock:
+            for offset in self.offsets[start:stop]:
+                self.file.seek(offset)
+                record = json.loads(self.file.readline())
+                rows.append({column: record.get(column) for column in columns} if columns else record)
+        return rows
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __del__(self) -> None:
+        # st.cache_resource evicts by dropping its reference; the handle goes with the source
+        file = getattr(self, "file", None)
+        if file is not None:
+            file.close()
+
+    def iter_records(self) -> Iterator[Dict]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class ParquetSource:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = pq.ParquetFile(path)
+        self.columns = self.file.schema_arrow.names
+        # First row of every row group, so a page maps to the few groups it spans
+        self.starts = [0]
+        for group in range(self.file.num_row_groups):
+            self.starts.append(self.starts[-1] + self.file.metadata.row_group(group).num_rows)
+
+    def __len__(self) -> int:
+        return self.file.metadata.num_rows
+
+    def index_bytes(self) -> int:
+        return self.file.metadata.serialized_size
+
+    def read(self, start: int, stop: int, columns: List[str] = None) -> List[Dict]:
+        groups = [group for group in range(self.file.num_row_groups)
+                  if self.starts[group] < stop and self.starts[group + 1] > start]
+        if not groups:
+            return []
+        table = self.file.read_row_groups(groups, columns=columns or None)
+        return table.slice(start - self.starts[groups[0]], stop - start).to_pylist()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __del__(self) -> None:
+        file = getattr(self, "file", None)
+        if file is not None:
+            file.close()
+
+    def iter_records(self) -> Iterator[Dict]:
+        for batch in self.file.iter_batches():
+            yield from batch.to_pylist()
+
+
+def open_source(path: str):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"The file {path} does not exist.")
+    if path.endswith(".parquet"):
+        return ParquetSource(path)
+    if path.endswith(".jsonl"):
+        return JsonlSource(path)
+    raise ValueError(f"Expected a .jsonl or .parquet file, got {path}")